@@ -0,0 +1,57 @@
+#! /usr/bin/python
+import sys, getopt, random, time
+from classes.Instance import Instance
+from solver import solve
+from chainer import namedFilters, chainPolicella
+from chainFilters import filterByTime, sequence, fallback, CompiledFilter
+
+def showUsage():
+	print '''Compares the throughput of the filter combinators with compiled filters, for every named filter.
+
+Usage: benchmarkFilters.py [-s solver] [-r repetitions] instance(s)
+'''
+
+def benchmark(chainFilter, problems, repetitions):
+	"""Chains all problems with the given filter, returns the number of filter evaluations per second and the resulting POSes.
+	Only the time spent in the filter is counted."""
+	stats = {'evaluations': 0, 'seconds': 0.0}
+	def timedFilter(chains, data):
+		start = time.time()
+		result = chainFilter(chains, data)
+		stats['seconds'] += time.time() - start
+		stats['evaluations'] += 1
+		return result
+
+	poses = []
+	for repetition in range(repetitions):
+		for (instance, solution) in problems:
+			random.seed(repetition)
+			poses.append(chainPolicella(instance, solution, timedFilter))
+	seconds = stats['seconds']
+	return (stats['evaluations'] / seconds if seconds > 0 else 0.0, poses)
+
+def main():
+	opts, args = getopt.getopt(sys.argv[1:], 's:r:')
+	opts = {k:v for (k, v) in opts}
+	if len(args) == 0:
+		showUsage()
+		return 1
+
+	solver = opts.get('-s', 'serial')
+	repetitions = int(opts.get('-r', '1'))
+	problems = []
+	for filename in args:
+		instance = Instance.readFromFile(filename)
+		problems.append((instance, solve({'options': {'solver': solver}, 'instance': instance})))
+
+	print " | ".join(['filter', 'combinators (evals/s)', 'compiled (evals/s)', 'speedup', 'same POS'])
+	for (tag, filt) in namedFilters:
+		combined = sequence([filterByTime, fallback([filt])])
+		(combinatorSpeed, combinatorPoses) = benchmark(combined, problems, repetitions)
+		(compiledSpeed, compiledPoses) = benchmark(CompiledFilter(combined), problems, repetitions)
+		samePoses = all([[act.predecessors for act in a.activities] == [act.predecessors for act in b.activities] for (a, b) in zip(combinatorPoses, compiledPoses)])
+		speedup = compiledSpeed / combinatorSpeed if combinatorSpeed > 0 else 0.0
+		print "{0} | {1:.0f} | {2:.0f} | {3:.2f} | {4}".format(tag, combinatorSpeed, compiledSpeed, speedup, samePoses)
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -5,21 +5,18 @@
 ##
 def filterByTime(chains, data):
 	"Retains chains which are available at the time of the activity being scheduled"
-	lastTimes = data['lastTimes']
-	return {chain for chain in chains if lastTimes[chain] <= data['time']}
+	return data['chainIndex'].availableChains(data['time']).intersection(chains)
 
 def filterMaxCC(chains, data):
 	"Retains chains which have the latest activity in common with the previously selected chain"
-	lastPredecessor = data['lastPredecessor']
-	lastActs = data['lastActs']
-	return {chain for chain in chains if lastActs[chain] == lastPredecessor}
+	return data['chainIndex'].chainsOf(data['lastPredecessor']).intersection(chains)
 
 def filterMinID(chains, data):
 	"Retains chains of which the last activity is already a predecessor of the current activity"
-	lastActs = data['lastActs']
 	actId = data['actId']
 	pos = data['pos']
-	return {chain for chain in chains if pos.containsPath(lastActs[chain], actId)}
+	groups = data['chainIndex'].groupByAct(chains)
+	return {chain for (act, actChains) in groups.iteritems() if pos.containsPath(act, actId) for chain in actChains}
 
 def filterMaxSlack(chains, data):
 	"Retains the chains which would provide the most slack (or earliest end time)"
@@ -39,7 +36,7 @@ def filterMinDistance(chains, data):
 	lastActs = data['lastActs']
 	pos = data['pos']
 	
-	distances = pos.calculateShortestDistances(actId)
+	distances = _shared(data, ('distances', actId), lambda: pos.calculateShortestDistances(actId))
 	chainDistances = [distances[lastActs[chain]] for chain in chains]
 	return {chain for chain in chains if distances[lastActs[chain]] == min(chainDistances)}
 
@@ -49,9 +46,9 @@ def filterMinAddedSucc(chains, data):
 	lastActs = data['lastActs']
 	pos = data['pos']
 	
-	actSuccessors = pos.getAllSuccessors(actId)
+	actSuccessors = _shared(data, ('successors', actId), lambda: pos.getAllSuccessors(actId))
 
-	actValueFunction = lambda act: len(actSuccessors - pos.getAllSuccessors(act))
+	actValueFunction = lambda act: len(actSuccessors - _shared(data, ('successors', act), lambda: pos.getAllSuccessors(act)))
 	return _filterActValueMinimum(chains, lastActs, actValueFunction)
 
 def filterMinSucc(chains, data):
@@ -60,29 +57,32 @@ def filterMinSucc(chains, data):
 	activities = data['pos'].activities
 	startTimes = data['solution'].startTimes
 	
-	actValueFunction = lambda act: len(filter(lambda actId: startTimes[actId] >= data['time'], activities[act].successors))
+	openSuccessors = lambda act: len(filter(lambda actId: startTimes[actId] >= data['time'], activities[act].successors))
+	actValueFunction = lambda act: _shared(data, ('openSuccessors', act), lambda: openSuccessors(act))
 	return _filterActValueMinimum(chains, lastActs, actValueFunction)
 
 def filterMinChains(chains, data):
 	"Retains the chains of the activities with the lowest amount of free chains"
 	lastActs = data['lastActs']
-	actValueFunction = lambda act: len(filter(lambda actId: actId == act, lastActs))
+	actValueFunction = data['chainIndex'].count
 	return _filterActValueMinimum(chains, lastActs, actValueFunction)
 
 def filterMaxChains(chains, data):
 	"Retains the chains of the activities with the highest amount of free chains"
 	lastActs = data['lastActs']
-	actValueFunction = lambda act: -1 * len(filter(lambda actId: actId == act, lastActs))
+	chainIndex = data['chainIndex']
+	actValueFunction = lambda act: -1 * chainIndex.count(act)
 	return _filterActValueMinimum(chains, lastActs, actValueFunction)
 
 def filterMinAddedPredecessors(chains, data):
 	lastActs = data['lastActs']
 	neededChains = data['required'] - data['assigned']
 	pos = data['pos']
-	actPredecessors = pos.getAllPredecessors(data['actId'])
+	actPredecessors = _predecessors(data, data['actId'])
 
-	numChainsPerAct = {act: min([neededChains, len(filter(lambda actId: actId == act, lastActs))]) for act in lastActs}
-	numAddedPredecessors = lambda act: float(len(pos.getAllPredecessors(act) - actPredecessors)) / float(numChainsPerAct[act])
+	chainIndex = data['chainIndex']
+	numChainsPerAct = {act: min([neededChains, chainIndex.count(act)]) for act in chainIndex.chainsByAct}
+	numAddedPredecessors = lambda act: float(len(_predecessors(data, act) - actPredecessors)) / float(numChainsPerAct[act])
 
 	return _filterActValueMinimum(chains, lastActs, numAddedPredecessors)
 
@@ -95,13 +95,13 @@ def filterMinAddedPredecessors2(chains, data):
 	if len(filteredActs) == 1:
 		return chains
 
-	currentActPredecessors = pos.getAllPredecessors(data['actId'])
-	chainActPredecessors = {act: pos.getAllPredecessors(act) for act in filteredActs}
+	currentActPredecessors = _predecessors(data, data['actId'])
+	chainActPredecessors = {act: _predecessors(data, act) for act in filteredActs}
 
-	numChainsPerAct = {act: len(filter(lambda actId: actId == act, lastActs)) for act in filteredActs}
+	numChainsPerAct = {act: data['chainIndex'].count(act) for act in filteredActs}
 	
 	numAddedPredecessors2 = lambda act: min({
-		float(len((chainActPredecessors[act] + chainActPredecessors[nextAct]) - currentActPredecessors)) / 
+		float(len((chainActPredecessors[act] | chainActPredecessors[nextAct]) - currentActPredecessors)) / 
 		float(min([numChainsPerAct[act] + numChainsPerAct[nextAct],neededChains])) 
 		for nextAct in filteredActs if nextAct != act})
 
@@ -113,7 +113,8 @@ def filterSuffChains(chains, data):
 	"Retains the chains of the activities with sufficient free chains"
 	lastActs = data['lastActs']
 	neededChains = data['required'] - data['assigned']
-	chainsPerAct = lambda act: -1 * len(filter(lambda actId: actId == act, lastActs))
+	chainIndex = data['chainIndex']
+	chainsPerAct = lambda act: -1 * chainIndex.count(act)
 
 	return _filterActValueThreshold(chains, lastActs, chainsPerAct, -1 * neededChains)
 
@@ -125,11 +126,26 @@ def filterNonDecreasedSlack(chains, data):
 	startTimes = data['solution'].startTimes
 	time = data['time']
 
-	actSuccTime = lambda act: -1 * min([startTimes[succ] for succ in activities[act].successors]) if len(activities[act].successors) > 0 else 0
+	earliestSuccTime = lambda act: -1 * min([startTimes[succ] for succ in activities[act].successors]) if len(activities[act].successors) > 0 else 0
+	actSuccTime = lambda act: _shared(data, ('earliestSuccessorStart', act), lambda: earliestSuccTime(act))
 
 	return _filterActValueThreshold(chains, lastActs, actSuccTime, -1 * time)
 
 
+def _shared(data, key, compute):
+	"""Returns a value that is shared by all filters during one evaluation of a compiled filter.
+	Outside a compiled filter, the value is simply computed."""
+	shared = data.get('shared')
+	if shared == None:
+		return compute()
+	if not key in shared:
+		shared[key] = compute()
+	return shared[key]
+
+def _predecessors(data, actId):
+	"Returns the (shared) set of all predecessors of an activity in the POS"
+	return _shared(data, ('predecessors', actId), lambda: data['pos'].getAllPredecessors(actId))
+
 def _filterActValueMinimum(chains, lastActs, actValueFunction):
 	"Retains chains for which the result of actValueFunction(actID) is lowest"
 	filteredActs = {lastActs[chain] for chain in chains}
@@ -172,6 +188,21 @@ def _chain(chains, data, f1, f2):
 		return set()
 	return f2(temp, data)
 
+# Composite filter, built by the filter function builders.
+# It can be called like any other filter, and keeps its structure so it can be compiled.
+# Fields:
+#  kind: 'sequence' (two filters) or 'ifthenelse' (three filters)
+#  filters: the filters it is composed of
+class FilterNode:
+	def __init__(self, kind, filters):
+		self.kind = kind
+		self.filters = filters
+
+	def __call__(self, chains, data):
+		if self.kind == 'sequence':
+			return _chain(chains, data, self.filters[0], self.filters[1])
+		return _ite(chains, data, self.filters[0], self.filters[1], self.filters[2])
+
 ##
 ## FILTER FUNCTION BUILDERS
 ## These functions take filter functions and build a larger composite function
@@ -184,12 +215,12 @@ def sequence(filters):
 	if len(filters) == 1:
 		return head
 	tailfun = sequence(filters[1:])
-	return lambda chains, data:  _chain(chains, data, head, tailfun)
+	return FilterNode('sequence', [head, tailfun])
 
 def ifthenelse(fif, fthen = _identity, felse = _identity):
 	"""Takes three filter functions and will return a function that executes the first filter, if the result is non-empty runs the second filter on that set, if the result of the first filter is empty, the third filter is executed on the original set of chains.
 	Note that by default, the fthen and felse functions are the identity function."""
-	return lambda chains, data : _ite(chains, data, fif, fthen, felse)
+	return FilterNode('ifthenelse', [fif, fthen, felse])
 
 def fallback(filters):
 	"""Takes a sequence of filter functions and will return an function that executes these filters in order until one returns a non-empty set; this set is returned
@@ -199,3 +230,55 @@ def fallback(filters):
 	tailfun = fallback(filters[1:])
 	return ifthenelse(filters[0], felse = tailfun)
 
+##
+## FILTER COMPILER
+## Compiles a composite filter into a single flat function: the intermediate sets are local variables,
+## and no nested filter functions are called. Values computed through _shared are computed once per
+## evaluation and shared between all filters.
+##
+class CompiledFilter:
+	def __init__(self, compositeFilter):
+		self.filters = []
+		self.numVariables = 1
+		lines = ["def evaluate(r0, data):", "\tdata['shared'] = {}"]
+		result = self._compile(compositeFilter, 'r0', lines, 1)
+		lines += ["\tdel data['shared']", "\treturn " + result]
+		self.source = "\n".join(lines)
+
+		namespace = {'f{0}'.format(i): filt for (i, filt) in enumerate(self.filters)}
+		exec self.source in namespace
+		self.evaluate = namespace['evaluate']
+
+	def __call__(self, chains, data):
+		return self.evaluate(chains, data)
+
+	def _newVariable(self):
+		self.numVariables += 1
+		return 'r{0}'.format(self.numVariables - 1)
+
+	def _compile(self, node, source, lines, depth):
+		"""Adds the lines for a filter working on the source variable, returns the variable holding its result"""
+		indent = "\t" * depth
+		if node == _identity:
+			return source
+		if not isinstance(node, FilterNode):
+			target = self._newVariable()
+			self.filters.append(node)
+			lines.append("{0}{1} = f{2}({3}, data)".format(indent, target, len(self.filters) - 1, source))
+			return target
+
+		out = self._newVariable()
+		first = self._compile(node.filters[0], source, lines, depth)
+		lines.append("{0}if len({1}) > 0:".format(indent, first))
+		if node.kind == 'sequence':
+			result = self._compile(node.filters[1], first, lines, depth + 1)
+			lines.append("{0}\t{1} = {2}".format(indent, out, result))
+			lines.append("{0}else:".format(indent))
+			lines.append("{0}\t{1} = set()".format(indent, out))
+		else:
+			result = self._compile(node.filters[1], first, lines, depth + 1)
+			lines.append("{0}\t{1} = {2}".format(indent, out, result))
+			lines.append("{0}else:".format(indent))
+			result = self._compile(node.filters[2], source, lines, depth + 1)
+			lines.append("{0}\t{1} = {2}".format(indent, out, result))
+		return out
@@ -1,8 +1,11 @@
 import random
+import numpy
+from multiprocessing import Pool, current_process
+from classes.ChainIndex import ChainIndex
 from chainFilters import filterByTime, filterMaxCC, filterMinID
 from chainFilters import filterMaxSlack, filterMinSlack, filterNonDecreasedSlack
 from chainFilters import filterMinChains, filterMaxChains, filterSuffChains, filterMinSucc, filterMinAddedPredecessors, filterMinAddedPredecessors2
-from chainFilters import sequence, fallback
+from chainFilters import sequence, fallback, CompiledFilter
 
 namedFilters = [
 	('special', fallback([filterMaxCC, sequence([filterMinID, filterMinSlack]), sequence([filterNonDecreasedSlack, filterMinSlack]), filterMaxSlack])),
@@ -19,19 +22,84 @@ namedFilters = [
 	('flexopt_transitive2', fallback([filterMaxCC, sequence([filterMinID, filterMinSucc]), sequence([filterMinAddedPredecessors2,filterMinSucc])]))
 ]
 
+sampleObjectives = ['flex', 'constraints', 'makespan']
+
 def chain(data):
 	# get data
 	instance = data['instance']
 	solution = data['solution']
 	options = data['options']
 
-	# determine filters
-	chainFilter = chooseFilters(options['chainer'], options['debug'])
+	skipImplied = options.get('skipimplied', False)
+
+	# sample seeded chainings if asked to
+	samples = int(options.get('samples', '1'))
+	seed = options.get('seed', '')
+	if samples > 1 or seed != '':
+		pos = chainSampling(data, samples, int(seed or '0'), options.get('objective', 'flex'), skipImplied)
+	else:
+		# determine filters
+		chainFilter = chooseFilters(options['chainer'], options['debug'])
+
+		# create POS
+		pos = chainPolicella(instance, solution, chainFilter, options['debug'], skipImplied = skipImplied)
+
+	if options.get('reducepos', False):
+		reduced = pos.getTransitiveReduction()
+		reduced.statistics.update(pos.statistics)
+		return reduced
+	return pos
+
+def chainSampling(data, samples, firstSeed, objective, skipImplied = False):
+	"""Chains the solution once for every seed from firstSeed on, and returns the POS with the best score on the objective.
+	The samples are distributed over all cores, unless pooling is disabled.
+	The seed of the returned POS is stored in its statistics, so the POS can be regenerated with that seed."""
+	options = data['options']
+	scenarios = getScoreScenarios(data) if objective == 'makespan' else None
+	jobs = [(data['instance'], data['solution'], options['chainer'], seed, objective, scenarios, skipImplied) for seed in range(firstSeed, firstSeed + samples)]
+
+	if samples > 1 and not options.get('st') and not current_process().daemon:
+		workers = Pool()
+		results = workers.map(chainSample, jobs)
+		workers.close()
+		workers.join()
+	else:
+		results = map(chainSample, jobs)
+
+	(score, seed, pos) = min(results, key = lambda result: result[:2])
+	if options['debug']: print 'best sample: seed', seed, 'with', objective, 'score', score
+	pos.statistics.update({'seed': seed, 'samples': samples, 'score': score, 'meanScore': float(sum([result[0] for result in results])) / len(results)})
+	return pos
+
+def chainSample(job):
+	"""Chains the solution with seeded tie-breaking, returns a (score, seed, pos) tuple. Lower scores are better."""
+	(instance, solution, chainOption, seed, objective, scenarios, skipImplied) = job
+	pos = chainPolicella(instance, solution, chooseFilters(chainOption), rng = random.Random(seed), skipImplied = skipImplied)
+	return (scorePOS(pos, objective, scenarios), seed, pos)
 
-	# create POS
-	return chainPolicella(instance, solution, chainFilter, options['debug'])
+def scorePOS(pos, objective, scenarios = None):
+	"""Returns the score of a POS on the objective, lower is better:
+	 flex: minus the flexibility of the POS
+	 constraints: the number of constraints in the transitive reduction of the POS
+	 makespan: the mean makespan of the POS over a (scenarios x activities) matrix of delay factors"""
+	if objective == 'flex':
+		return -pos.calculateFlex()
+	if objective == 'constraints':
+		return pos.getTransitiveReduction().countConstraints()
+	durations = numpy.array([act.time for act in pos.activities], dtype = float) * scenarios
+	ends = pos.getLongestPath().earliestStarts(durations) + durations
+	return float(ends.max(axis = -1).mean())
 
-def chooseFilters(chainOption, debug = False):
+def getScoreScenarios(data, numScenarios = 10):
+	"""Returns a (scenarios x activities) matrix with the delay factors of the first scenarios of the test set"""
+	delays = data.get('delays')
+	if delays == None:
+		from tester import loadDelays
+		delays = loadDelays(data['options'])
+	n = len(data['instance'].activities)
+	return numpy.array([delays[delayfile][:n] for delayfile in sorted(delays)[:numScenarios]])
+
+def chooseFilters(chainOption, debug = False, compiled = True):
 	command = chainOption
 	filters = []
 	while len(command) > 0:
@@ -44,25 +112,38 @@ def chooseFilters(chainOption, debug = False):
 		else: # if no commands were matched, break out of while loop
 			break
 
-	return sequence([filterByTime, fallback(filters)])
+	chainFilter = sequence([filterByTime, fallback(filters)])
+	if compiled:
+		return CompiledFilter(chainFilter)
+	return chainFilter
 
-def chainPolicella(instance, solution, chainFilter, debug=False):
+def chainPolicella(instance, solution, chainFilter, debug=False, rng=random, skipImplied=False, flows=None):
+	"""Creates a POS by assigning the activities to resource chains in order of their start time.
+	Chaining an activity adds a constraint from the last activity on the chosen chain. If skipImplied is set,
+	constraints that are already implied by the POS are not added.
+	If a flows dictionary is given, the resource flow of the chains is added to it: it maps (fromId, toId, resId)
+	to a number of resource units, with -1 as fromId for the source and as toId for the sink.
+	The number of added, implied and skipped constraints is stored in the statistics of the POS."""
 	# create ordering of activities
 	timedActivities = sorted([(time, act) for (act, time) in enumerate(solution.startTimes)])
 
-	# create POS
+	# create POS, with a reachability index that is kept up to date while chaining
 	pos = instance.clone()
+	pos.getReachability()
 
 	# set up data dictionary
 	data = {'pos':pos, 'debug':debug, 'solution': solution}
+	statistics = {'addedEdges': 0, 'impliedEdges': 0, 'skippedEdges': 0}
 
 	for (resId, resource) in enumerate(instance.resources):
-		lastTimes = [0] * resource
-		lastActs = [-1] * resource
-		chains = range(resource)
+		chainIndex = ChainIndex(resource)
+		lastTimes = chainIndex.lastTimes
+		lastActs = chainIndex.lastActs
+		chains = set(range(resource))
 
 		data['lastTimes'] = lastTimes
 		data['lastActs'] = lastActs
+		data['chainIndex'] = chainIndex
 
 		for (startTime, actId) in timedActivities:
 			data['actId'] = actId
@@ -80,12 +161,26 @@ def chainPolicella(instance, solution, chainFilter, debug=False):
 					print "Time:", startTime,
 					print "LastTimes:", lastTimes
 					print "LastActs:", lastActs
-				chain = random.choice([x for x in candidates])
-				if lastActs[chain] != -1:
-					pos.addPrecedenceConstraint(lastActs[chain], actId)
-				data['lastPredecessor'] = lastActs[chain]
-				lastActs[chain] = actId
-				lastTimes[chain] = startTime + act.time
+				chain = rng.choice([x for x in candidates])
+				lastAct = lastActs[chain]
+				if lastAct != -1 and not lastAct in pos.activities[actId].predecessors:
+					implied = pos.containsPath(lastAct, actId)
+					if implied:
+						statistics['impliedEdges'] += 1
+					if implied and skipImplied:
+						statistics['skippedEdges'] += 1
+					else:
+						pos.addPrecedenceConstraint(lastAct, actId)
+						statistics['addedEdges'] += 1
+				data['lastPredecessor'] = lastAct
+				chainIndex.assign(chain, actId, startTime + act.time)
+				if flows != None:
+					flows[(lastAct, actId, resId)] = flows.get((lastAct, actId, resId), 0) + 1
+
+		if flows != None:
+			for lastAct in lastActs:
+				if lastAct != -1:
+					flows[(lastAct, -1, resId)] = flows.get((lastAct, -1, resId), 0) + 1
 	
+	pos.statistics.update(statistics)
 	return pos
-
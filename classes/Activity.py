@@ -19,3 +19,10 @@ class Activity:
 		self.predecessors = self.successors
 		self.successors = tmp
 
+	def getReversedView(self):
+		"""Returns an activity sharing this activity's data, with predecessors and successors swapped"""
+		view = Activity(self.time, 0)
+		view.resources = self.resources
+		view.predecessors = self.successors
+		view.successors = self.predecessors
+		return view
@@ -0,0 +1,51 @@
+#! /usr/bin/python
+
+from bisect import bisect_left, bisect_right, insort
+
+# Class representing the chains of one resource while chaining.
+# Each unit of the resource is a chain; the chains are indexed by their last activity and by the time they become available.
+# Fields:
+#  lastActs: an array with the last activity of each chain (-1 for an empty chain)
+#  lastTimes: an array with the end time of the last activity of each chain
+#  chainsByAct: a dictionary mapping activities to the set of chains they are the last activity of
+#  byTime: a sorted array of (lastTime, chain) tuples
+class ChainIndex:
+	def __init__(self, capacity):
+		self.lastActs = [-1] * capacity
+		self.lastTimes = [0] * capacity
+		self.chainsByAct = {-1: set(range(capacity))} if capacity > 0 else {}
+		self.byTime = [(0, chain) for chain in range(capacity)]
+
+	def assign(self, chain, actId, endTime):
+		"""Appends an activity to a chain"""
+		oldAct = self.lastActs[chain]
+		self.chainsByAct[oldAct].remove(chain)
+		if len(self.chainsByAct[oldAct]) == 0:
+			del self.chainsByAct[oldAct]
+		self.chainsByAct.setdefault(actId, set()).add(chain)
+
+		del self.byTime[bisect_left(self.byTime, (self.lastTimes[chain], chain))]
+		insort(self.byTime, (endTime, chain))
+
+		self.lastActs[chain] = actId
+		self.lastTimes[chain] = endTime
+
+	def count(self, actId):
+		"""Returns the number of chains of which the activity is the last activity"""
+		return len(self.chainsByAct.get(actId, ()))
+
+	def chainsOf(self, actId):
+		"""Returns the set of chains of which the activity is the last activity"""
+		return self.chainsByAct.get(actId, set())
+
+	def availableChains(self, time):
+		"""Returns the set of chains that are available at the given time"""
+		end = bisect_right(self.byTime, (time, len(self.lastActs)))
+		return {chain for (_, chain) in self.byTime[:end]}
+
+	def groupByAct(self, chains):
+		"""Returns a dictionary mapping the last activities of the given chains to the given chains they end"""
+		groups = {}
+		for chain in chains:
+			groups.setdefault(self.lastActs[chain], set()).add(chain)
+		return groups
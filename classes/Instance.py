@@ -1,38 +1,72 @@
 #! /usr/bin/python
 
 import string
+from collections import namedtuple
 from Activity import Activity
+from LongestPath import LongestPath
+from Reachability import Reachability, bitsToIds
+
+CriticalPath = namedtuple('CriticalPath', ['earliestStart', 'earliestFinish', 'latestStart', 'latestFinish', 'length'])
 
 # Class representing an RCPSP Instance
 # Fields:
 #  resources: an array of integers, representing resource availability
 #  activities: an array of activities, with the indices doubling as IDs.
 #  name: a name, for clarity when examining the instances
+#  topologicalOrdering: cached result of getTopologicalOrdering, reset when the precedence constraints change
+#  criticalPath: cached result of getCriticalPath, reset when the precedence constraints change
+#  longestPath: cached result of getLongestPath, reset when the precedence constraints change
+#  reachability: cached result of getReachability, updated when a constraint is added and reset when one is removed
+#  statistics: a dictionary with numeric statistics of the chainer that created this POS, such as the seed.
+#              They are exported after the activities, so they are kept when the POS is read from file.
 class Instance:
 	def __init__(self):
 		self.resources = []
 		self.activities = []
 		self.name = "new instance"
+		self.statistics = {}
+		self.clearCache()
+
+	def clearCache(self):
+		"""Clears all data derived from the precedence constraints"""
+		self.topologicalOrdering = None
+		self.criticalPath = None
+		self.longestPath = None
+		self.reachability = None
 
 	def reverse(self):
 		"""Reverses the order of activities"""
+		self.clearCache()
 		for act in self.activities:
 			act.reverse()
 
+	def getReversedView(self):
+		"""Returns an instance sharing this instance's activity data, with all precedence constraints reversed.
+		Unlike reverse(), this leaves the instance itself untouched."""
+		view = Instance()
+		view.name = "reversed view of " + self.name
+		view.resources = self.resources
+		view.activities = [act.getReversedView() for act in self.activities]
+		return view
+
 	def calculateFlex(self):
-		self.addTransitiveConstraints()
-		numConnections = self.countConstraints()
-		self.removeTransitiveConstraints()
+		numConnections = self.getReachability().closureSize()
 
 		n = len(self.activities)
 		maxConnections = (n * (n - 1)) / 2
 		return float(maxConnections - numConnections) / maxConnections
 
 	def addPrecedenceConstraint(self, firstId, secondId):
+		self.topologicalOrdering = None
+		self.criticalPath = None
+		self.longestPath = None
+		if self.reachability != None:
+			self.reachability.addConstraint(firstId, secondId)
 		self.activities[firstId].successors.add(secondId)
 		self.activities[secondId].predecessors.add(firstId)
 
 	def removePrecedenceConstraint(self, firstId, secondId):
+		self.clearCache()
 		try:
 			self.activities[firstId].successors.remove(secondId)
 			self.activities[secondId].predecessors.remove(firstId)
@@ -55,6 +89,11 @@ class Instance:
 		return sum([act.time for act in self.activities])
 
 	def getTopologicalOrdering(self):
+		"""Returns the ids of the activities in a topological order. Activities on a cycle are left out.
+		The result is cached until the precedence constraints change, and should not be modified."""
+		if self.topologicalOrdering != None:
+			return self.topologicalOrdering
+
 		ordering = []
 		numPreds = [len(act.predecessors) for act in self.activities]
 		todo = [x for (x, n) in enumerate(numPreds) if n == 0]
@@ -66,35 +105,74 @@ class Instance:
 				numPreds[succ] -= 1
 				if numPreds[succ] == 0:
 					todo.append(succ)
+		self.topologicalOrdering = ordering
 		return ordering
 
+	def getCriticalPath(self):
+		"""Returns the earliest and latest start and finish times of all activities, ignoring resources.
+		The latest times are relative to the critical path length. The result is cached until the precedence constraints change."""
+		if self.criticalPath != None:
+			return self.criticalPath
 
+		n = len(self.activities)
+		order = self.getTopologicalOrdering()
+		earliestStart = [0] * n
+		earliestFinish = [0] * n
+		for actId in order:
+			act = self.activities[actId]
+			for pred in act.predecessors:
+				if earliestFinish[pred] > earliestStart[actId]:
+					earliestStart[actId] = earliestFinish[pred]
+			earliestFinish[actId] = earliestStart[actId] + act.time
+
+		length = max(earliestFinish) if n > 0 else 0
+		latestStart = [length] * n
+		latestFinish = [length] * n
+		for actId in reversed(order):
+			act = self.activities[actId]
+			for succ in act.successors:
+				if latestStart[succ] < latestFinish[actId]:
+					latestFinish[actId] = latestStart[succ]
+			latestStart[actId] = latestFinish[actId] - act.time
+
+		self.criticalPath = CriticalPath(earliestStart, earliestFinish, latestStart, latestFinish, length)
+		return self.criticalPath
+
+	def getLongestPath(self):
+		"""Returns the longest path engine of the precedence network, to compute earliest start times for any durations.
+		The result is cached until the precedence constraints change."""
+		if self.longestPath == None:
+			self.longestPath = LongestPath(self)
+		return self.longestPath
+
+	def getReachability(self):
+		"""Returns the reachability index (transitive closure) of the precedence network.
+		The result is cached until the precedence constraints change."""
+		if self.reachability == None:
+			self.reachability = Reachability(self)
+		return self.reachability
 
 	def addTransitiveConstraints(self):
-		"""Adds all transitive constraints in O(n^3) time."""
-		order = self.getTopologicalOrdering()
-		n = len(order)
-		for i in range(n):
-			act_i = self.activities[order[i]]
-			for j in range(i + 1, n):
-				if order[j] in act_i.successors:
-					act_j = self.activities[order[j]]
-					for k in range(j + 1, n):
-						if order[k] in act_j.successors:
-							self.addPrecedenceConstraint(order[i], order[k])
+		"""Adds all transitive constraints, using the bitsets of the reachability index."""
+		reachability = self.getReachability()
+		for actId in range(len(self.activities)):
+			for desc in bitsToIds(reachability.descendants[actId]):
+				self.addPrecedenceConstraint(actId, desc)
 
 	def removeTransitiveConstraints(self):
-		"""Removes all transitive constraints in O(n^3) time."""
-		n = len(self.activities)
-		order = self.getTopologicalOrdering()
-		for i in range(n):
-			act_i = self.activities[order[i]]
-			for j in range(i + 1, n):
-				if order[j] in act_i.successors:
-					act_j = self.activities[order[j]]
-					for k in range(j + 1, n):
-						if order[k] in act_j.successors:
-							self.removePrecedenceConstraint(order[i], order[k])
+		"""Removes all constraints implied by other constraints, leaving the transitive reduction."""
+		reduction = self.getReachability().transitiveReduction()
+		for (actId, act) in enumerate(self.activities):
+			for succ in act.successors - reduction[actId]:
+				self.removePrecedenceConstraint(actId, succ)
+
+	def getTransitiveReduction(self):
+		"""Returns a copy of this instance containing only the constraints that are not implied by other constraints."""
+		reduced = self.clone()
+		reduced.name = self.name
+		reduced.resources = self.resources[:]
+		reduced.removeTransitiveConstraints()
+		return reduced
 
 	def countConstraints(self):
 		return sum(map(lambda act: len(act.successors), self.activities))
@@ -121,33 +199,23 @@ class Instance:
 						todo.add((pred, distance + 1))
 		return distances
 
-	def getAllSuccessors(self, actId, successors = None):
-		if successors == None:
-			successors = [None] * len(self.activities)
-		if not (successors[actId] == None):
-			return successors[actId]
-		actsucc = self.activities[actId].successors
-		allsucc = reduce(set.union, map(lambda aId: self.getAllSuccessors(aId, successors), actsucc), actsucc)
-		successors[actId] = allsucc
-		return allsucc
-
-	def getAllPredecessors(self, actId, predecessors = None):
-		if predecessors == None:
-			predecessors = [None] * len(self.activities)
-		if not (predecessors[actId] == None):
-			return predecessors[actId]
-		actPred = self.activities[actId].predecessors
-		allPred = reduce(set.union, map(lambda aId: self.getAllPredecessors(aId, predecessors), actPred), actPred)
-		predecessors[actId] = allPred
-		return allPred
+	def getAllSuccessors(self, actId):
+		return self.getReachability().getDescendants(actId)
+
+	def getAllPredecessors(self, actId):
+		return self.getReachability().getAncestors(actId)
 
 	def containsPath(self, fromAct, toAct):
-		return toAct in self.getAllSuccessors(fromAct)
+		return self.getReachability().reaches(fromAct, toAct)
 
 	def exportToOpenedFile(self, outfile):
 		outfile.write('%d,%s\n' % (len(self.resources), ','.join(map(str, self.resources))))
 		for act in self.activities:
 			outfile.write('%d,%s,%s\n' % (act.time, ' '.join(map(str, act.predecessors)),' '.join(map(str, act.resources))))
+		if len(self.statistics) > 0:
+			outfile.write('\n')
+			for (key, value) in sorted(self.statistics.iteritems()):
+				outfile.write('{0}:{1!r}\n'.format(key, value))
 
 	def writeToFile(self, filename):
 		f = file(filename, 'w')
@@ -193,6 +261,12 @@ class Instance:
 		for (actId, act) in enumerate(self.activities):
 			for pred in act.predecessors:
 				self.activities[pred].successors.add(actId)
+
+		# statistics follow the activities after an empty line
+		for line in infile:
+			parts = string.strip(line).split(':')
+			if len(parts) == 2:
+				self.statistics[parts[0]] = parseNumber(parts[1])
 	
 	def readFromPSPLIB(self, infile):
 		# skip first lines (not interesting)
@@ -287,3 +361,10 @@ class Instance:
 		print "Jobs:"
 		for i, job in enumerate(self.activities):
 			print "  Job %d: length %d, %d predecessors, %d successors" % (i, job.time, len(job.predecessors), len(job.successors))
+
+def parseNumber(value):
+	"""Parses an exported statistic, an integer or a float"""
+	try:
+		return int(value)
+	except ValueError:
+		return float(value)
@@ -0,0 +1,89 @@
+#! /usr/bin/python
+
+# Class representing a mixed integer linear program that minimises its objective, independent of the solver used.
+# The constraints are stored as the nonzero entries of a sparse matrix, so a backend can build its model in one go.
+# Fields:
+#  name: a name, passed on to the solver
+#  lower, upper: arrays with the bounds of each variable
+#  objective: an array with the objective coefficient of each variable
+#  integer: an array of booleans, True for integer variables
+#  varNames: an array with the name of each variable
+#  rows, cols, values: arrays with the row, column and value of each nonzero entry of the constraint matrix
+#  rowLower, rowUpper: arrays with the bounds of each constraint, infinite when a side is unbounded
+#  rowNames: an array with the name of each constraint
+#  start: an array with a starting solution (a MIP start), or None
+#  statistics: a dictionary with statistics of the last solver run, filled by the backend
+class LinearModel:
+	def __init__(self, name):
+		self.name = name
+		self.lower = []
+		self.upper = []
+		self.objective = []
+		self.integer = []
+		self.varNames = []
+		self.rows = []
+		self.cols = []
+		self.values = []
+		self.rowLower = []
+		self.rowUpper = []
+		self.rowNames = []
+		self.start = None
+		self.statistics = {}
+
+	def addVariable(self, lower, upper, objective = 0.0, integer = False, name = ''):
+		"""Adds a variable, returns its index"""
+		self.lower.append(float(lower))
+		self.upper.append(float(upper))
+		self.objective.append(float(objective))
+		self.integer.append(integer)
+		self.varNames.append(name)
+		return len(self.lower) - 1
+
+	def addVariables(self, lower, upper, objective, integer = False, names = None):
+		"""Adds a batch of variables of one type, given arrays with their bounds, objective coefficients and (optionally) names.
+		Returns the index of the first variable."""
+		first = len(self.lower)
+		self.lower.extend(map(float, lower))
+		self.upper.extend(map(float, upper))
+		self.objective.extend(map(float, objective))
+		self.integer.extend([integer] * len(lower))
+		self.varNames.extend(names if names != None else [''] * len(lower))
+		return first
+
+	def addConstraint(self, weights, variables, sense, rhs, name = ''):
+		"""Adds the constraint sum(weights[i] * variables[i]) (sense) rhs, with sense one of '<', '=' or '>'.
+		Returns the index of the constraint."""
+		row = len(self.rowLower)
+		self.rows.extend([row] * len(variables))
+		self.cols.extend(variables)
+		self.values.extend(map(float, weights))
+		self.rowLower.append(float(rhs) if sense != '<' else float('-inf'))
+		self.rowUpper.append(float(rhs) if sense != '>' else float('inf'))
+		self.rowNames.append(name)
+		return row
+
+	def addConstraints(self, rows, cols, values, rowLower, rowUpper, names = None):
+		"""Adds a batch of constraints, given the nonzero entries of their matrix (with rows numbered from 0 within the batch),
+		arrays with the bounds of each constraint and (optionally) their names. Returns the index of the first constraint."""
+		first = len(self.rowLower)
+		self.rows.extend([first + row for row in rows])
+		self.cols.extend(cols)
+		self.values.extend(map(float, values))
+		self.rowLower.extend(map(float, rowLower))
+		self.rowUpper.extend(map(float, rowUpper))
+		self.rowNames.extend(names if names != None else [''] * len(rowLower))
+		return first
+
+	def numVariables(self):
+		return len(self.lower)
+
+	def numConstraints(self):
+		return len(self.rowLower)
+
+	def getRowEntries(self):
+		"""Returns for every constraint a tuple of its (weights, variables)"""
+		entries = [([], []) for row in self.rowLower]
+		for (row, col, value) in zip(self.rows, self.cols, self.values):
+			entries[row][0].append(value)
+			entries[row][1].append(col)
+		return entries
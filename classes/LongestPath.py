@@ -0,0 +1,54 @@
+#! /usr/bin/python
+
+import numpy
+
+# Class computing earliest start times over the precedence network of an instance, ignoring resources.
+# The network is stored once, so start times can be computed for any vector of durations.
+# Activities are grouped in topological levels: all predecessors of an activity are in earlier levels,
+# so the start times of a whole level are computed with a single vectorised step.
+# Fields:
+#  numActivities: the number of activities in the network
+#  unordered: ids of the activities that are not part of the topological ordering (only when there is a cycle)
+#  levels: for each level after the first, a tuple (actIds, predIds, offsets), with the predecessors of
+#          all activities in the level stored in one array (CSR format), offsets marking where each activity's predecessors begin
+class LongestPath:
+	def __init__(self, instance):
+		activities = instance.activities
+		order = instance.getTopologicalOrdering()
+		self.numActivities = len(activities)
+
+		inOrder = [False] * self.numActivities
+		levelOf = [0] * self.numActivities
+		for actId in order:
+			inOrder[actId] = True
+			for pred in activities[actId].predecessors:
+				if levelOf[pred] + 1 > levelOf[actId]:
+					levelOf[actId] = levelOf[pred] + 1
+		self.unordered = numpy.array([actId for actId in range(self.numActivities) if not inOrder[actId]], dtype = int)
+
+		numLevels = max([levelOf[actId] for actId in order]) + 1 if order else 0
+		levelActs = [[] for level in range(numLevels)]
+		for actId in order:
+			levelActs[levelOf[actId]].append(actId)
+
+		self.levels = []
+		for acts in levelActs[1:]:
+			predIds = []
+			offsets = []
+			for actId in acts:
+				offsets.append(len(predIds))
+				predIds.extend(sorted(activities[actId].predecessors))
+			self.levels.append((numpy.array(acts, dtype = int), numpy.array(predIds, dtype = int), numpy.array(offsets, dtype = int)))
+
+	def earliestStarts(self, durations):
+		"""Returns an array with the earliest start time of every activity, given an array of durations.
+		The durations can also be a (scenarios x activities) matrix, in which case all scenarios are computed
+		at once and a matrix of start times is returned.
+		Activities that cannot be ordered (only when there is a cycle) get start time -1."""
+		durations = numpy.asarray(durations)
+		starts = numpy.zeros(durations.shape[:-1] + (self.numActivities,), dtype = durations.dtype)
+		starts[..., self.unordered] = -1
+		for (actIds, predIds, offsets) in self.levels:
+			ends = starts[..., predIds] + durations[..., predIds]
+			starts[..., actIds] = numpy.maximum.reduceat(ends, offsets, axis = -1)
+		return starts
@@ -0,0 +1,47 @@
+#! /usr/bin/python
+
+import numpy
+
+# Class representing the pairwise float of a schedule: for every pair of activities (a, b), the least total float
+# of the precedence constraints on a path from a to b, capped at the horizon of the instance.
+# The matrix is computed by dynamic programming over the reverse topological order: the row of an activity is
+# the element-wise minimum, over its successors, of the float to that successor plus the row of that successor.
+# Fields:
+#  horizon: the horizon of the instance, the float of pairs without a path
+#  floats: an (activities x activities) array with the pairwise float
+class PairwiseFloat:
+	def __init__(self, instance, solution):
+		activities = instance.activities
+		n = len(activities)
+		self.horizon = instance.getHorizon()
+		startTimes = numpy.array(solution.startTimes)
+		durations = numpy.array([act.time for act in activities])
+
+		floats = numpy.full((n, n), numpy.inf)
+		numpy.fill_diagonal(floats, 0)
+		for actId in reversed(instance.getTopologicalOrdering()):
+			row = floats[actId]
+			for succ in activities[actId].successors:
+				numpy.minimum(row, floats[succ] + (startTimes[succ] - startTimes[actId] - durations[actId]), out = row)
+		self.floats = numpy.minimum(floats, self.horizon).astype(numpy.result_type(startTimes, durations, self.horizon))
+
+	def connectedTotalFloat(self):
+		"""Returns the sum of the pairwise floats below the horizon, over all pairs of activities (i, j) with i < j"""
+		upper = self.floats[numpy.triu_indices(len(self.floats), 1)]
+		return upper[upper < self.horizon].sum().item()
+
+	def totalFloat(self, limits):
+		"""Returns the sum of the pairwise floats over all pairs of activities (i, j) with i < j, each limited to limits[i].
+		The limits can also be a (scenarios x activities) matrix, in which case an array with the total float of each scenario is returned."""
+		limits = numpy.asarray(limits)
+		scenarios = limits.reshape(-1, limits.shape[-1])
+		totals = numpy.zeros(len(scenarios), dtype = numpy.result_type(scenarios, self.floats))
+		for i in range(len(self.floats) - 1):
+			# with the floats of a row sorted, the floats below a limit form a prefix
+			floats = numpy.sort(self.floats[i, i + 1:])
+			prefixSums = numpy.concatenate(([0], numpy.cumsum(floats)))
+			below = numpy.searchsorted(floats, scenarios[:, i])
+			totals += prefixSums[below] + scenarios[:, i] * (len(floats) - below)
+		if limits.ndim == 1:
+			return totals[0].item()
+		return totals
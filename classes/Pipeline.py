@@ -9,8 +9,9 @@ class Pipeline:
 	def addJob(self, key, filename, theClass, create):
 		self.jobs.append(Job(key, filename, theClass, create))
 
-	def execute(self, dataLib):
-		dirty = False
+	def execute(self, dataLib, dirty = False):
+		"""Reads the result of each job from file, or creates it if the file does not exist or an earlier result was recreated.
+		Returns whether any result was recreated."""
 		for job in self.jobs:
 			if isfile(job.filename) and not dirty:
 				dataLib[job.key] = job.theClass.readFromFile(job.filename, dataLib)
@@ -19,6 +20,7 @@ class Pipeline:
 				instance.writeToFile(job.filename)
 				dataLib[job.key] = instance
 				dirty = True
+		return dirty
 
 
 
@@ -0,0 +1,74 @@
+#! /usr/bin/python
+
+# Class representing the transitive closure of the precedence network of an instance.
+# Every activity has a bitset (a Python integer) of its descendants: bit j is set if activity j can be reached from it,
+# and a bitset of its ancestors. The bitsets are computed in (reverse) topological order, so the closure is built
+# in O(n * m / w) time. When a constraint is added, the closure is updated incrementally.
+# Fields:
+#  instance: the instance of which the closure is computed
+#  descendants: an array of bitsets, one per activity
+#  ancestors: an array of bitsets, one per activity
+class Reachability:
+	def __init__(self, instance):
+		self.instance = instance
+		activities = instance.activities
+		order = instance.getTopologicalOrdering()
+		self.descendants = [0] * len(activities)
+		for actId in reversed(order):
+			bits = 0
+			for succ in activities[actId].successors:
+				bits |= (1 << succ) | self.descendants[succ]
+			self.descendants[actId] = bits
+		self.ancestors = [0] * len(activities)
+		for actId in order:
+			bits = 0
+			for pred in activities[actId].predecessors:
+				bits |= (1 << pred) | self.ancestors[pred]
+			self.ancestors[actId] = bits
+
+	def addConstraint(self, fromAct, toAct):
+		"""Updates the closure for a new constraint: the new descendants are added to fromAct and its ancestors,
+		the new ancestors to toAct and its descendants. Implied constraints take constant time."""
+		if self.reaches(fromAct, toAct):
+			return
+		newDescendants = (1 << toAct) | self.descendants[toAct]
+		newAncestors = (1 << fromAct) | self.ancestors[fromAct]
+		for actId in bitsToIds(newAncestors):
+			self.descendants[actId] |= newDescendants
+		for actId in bitsToIds(newDescendants):
+			self.ancestors[actId] |= newAncestors
+
+	def reaches(self, fromAct, toAct):
+		"""Returns whether there is a path from one activity to the other"""
+		return (self.descendants[fromAct] >> toAct) & 1 == 1
+
+	def closureSize(self):
+		"""Returns the number of precedence constraints in the transitive closure"""
+		return sum([bin(bits).count('1') for bits in self.descendants])
+
+	def getDescendants(self, actId):
+		"""Returns the set of activities reachable from the given activity"""
+		return set(bitsToIds(self.descendants[actId]))
+
+	def getAncestors(self, actId):
+		"""Returns the set of activities from which the given activity can be reached"""
+		return set(bitsToIds(self.ancestors[actId]))
+
+	def transitiveReduction(self):
+		"""Returns for every activity the set of its successors that are not implied by other successors"""
+		reduction = []
+		for act in self.instance.activities:
+			implied = 0
+			for succ in act.successors:
+				implied |= self.descendants[succ]
+			reduction.append({succ for succ in act.successors if not (implied >> succ) & 1})
+		return reduction
+
+def bitsToIds(bits):
+	"""Returns the positions of the set bits, in increasing order"""
+	ids = []
+	while bits:
+		lowest = bits & -bits
+		ids.append(lowest.bit_length() - 1)
+		bits ^= lowest
+	return ids
@@ -0,0 +1,79 @@
+#! /usr/bin/python
+
+from bisect import bisect_right
+
+# Class representing the cumulative resource usage of a (partial) schedule.
+# The usage is stored as a step function: between two breakpoints the usage is constant.
+# Fields:
+#  capacities: an array of integers, representing resource availability
+#  times: a sorted array of breakpoints, the first one being 0
+#  usage: an array of usage vectors, usage[i] being the usage in [times[i], times[i + 1])
+class ResourceProfile:
+	def __init__(self, capacities):
+		self.capacities = capacities
+		self.times = [0]
+		self.usage = [[0] * len(capacities)]
+
+	def addActivity(self, activity, startTime):
+		"""Registers the resource usage of an activity starting at the given time"""
+		if activity.time <= 0:
+			return
+		first = self._split(startTime)
+		last = self._split(startTime + activity.time)
+		requirements = activity.resources
+		for i in range(first, last):
+			usage = self.usage[i]
+			for r in range(len(usage)):
+				usage[r] += requirements[r]
+
+	def clear(self):
+		"""Removes all activities, reusing the arrays of the profile"""
+		del self.times[1:]
+		del self.usage[1:]
+		usage = self.usage[0]
+		for r in range(len(usage)):
+			usage[r] = 0
+
+	def isFeasible(self, activity, startTime):
+		"""Returns whether the activity can start at the given time without exceeding capacity"""
+		return self._findConflict(activity, startTime) == -1
+
+	def earliestFeasibleStart(self, activity, time):
+		"""Returns the earliest time >= the given time at which the activity can start.
+		Instead of probing every time unit, this jumps to the end of the conflicting interval."""
+		conflict = self._findConflict(activity, time)
+		while conflict != -1:
+			time = self.times[conflict + 1]
+			conflict = self._findConflict(activity, time)
+		return time
+
+	def getResourceUsage(self, time):
+		"""Returns the resource usage at the given time"""
+		return self.usage[bisect_right(self.times, time) - 1][:]
+
+	def _findConflict(self, activity, startTime):
+		"""Returns the index of the last interval in which the activity would exceed capacity, or -1 if there is none"""
+		if activity.time <= 0:
+			return -1
+		endTime = startTime + activity.time
+		requirements = activity.resources
+		capacities = self.capacities
+		conflict = -1
+		i = bisect_right(self.times, startTime) - 1
+		while i < len(self.times) and self.times[i] < endTime:
+			usage = self.usage[i]
+			for r in range(len(capacities)):
+				if usage[r] + requirements[r] > capacities[r]:
+					conflict = i
+					break
+			i += 1
+		return conflict
+
+	def _split(self, time):
+		"""Ensures there is a breakpoint at the given time and returns its index"""
+		i = bisect_right(self.times, time) - 1
+		if self.times[i] == time:
+			return i
+		self.times.insert(i + 1, time)
+		self.usage.insert(i + 1, self.usage[i][:])
+		return i + 1
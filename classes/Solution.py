@@ -1,9 +1,15 @@
 #! /usr/bin/python
 
+import numpy
+from ResourceProfile import ResourceProfile
+from Instance import parseNumber
+
 class Solution:
 	def __init__(self, instance):
 		self.instance = instance
 		self.startTimes = [-1] * len(instance.activities)
+		self.profile = ResourceProfile(instance.resources)
+		self.statistics = {}
 		
 	@staticmethod
 	def readFromFile(filename, dataLib):
@@ -12,6 +18,11 @@ class Solution:
 		infile = file(filename, 'r')
 		line = infile.readline()
 		newSolution.startTimes = map(float, line.split())
+		# statistics of the solver follow the start times
+		for line in infile:
+			parts = line.strip().split(':')
+			if len(parts) == 2:
+				newSolution.statistics[parts[0]] = parseNumber(parts[1])
 		infile.close()
 
 		return newSolution
@@ -20,6 +31,9 @@ class Solution:
 		out = file(filename, 'w')
 		out.write(" ".join(map(str, self.startTimes)))
 		out.write('\n')
+		for (key, value) in sorted(self.statistics.iteritems()):
+			if not isinstance(value, list):
+				out.write('{0}:{1!r}\n'.format(key, value))
 		out.close()
 
 	def getMakespan(self):
@@ -37,5 +51,64 @@ class Solution:
 		
 		return usage
 
+	def getUsageProfile(self, startTimes = None, durations = None):
+		"""Returns the full resource usage profile, built in one pass with a difference array over the start and end times.
+		The result is a tuple (times, usage): a sorted array of all start and end times, and a (times x resources) array
+		with the usage from each of these times until the next. By default the start times of this solution and the durations
+		of the activities are used; other ones, such as those of a delayed schedule, can be given."""
+		activities = self.instance.activities
+		if startTimes is None:
+			startTimes = self.startTimes
+		if durations is None:
+			durations = [act.time for act in activities]
+		scheduled = [actId for actId in range(len(activities)) if startTimes[actId] > -1]
+
+		starts = numpy.array([startTimes[actId] for actId in scheduled], dtype = float)
+		ends = starts + numpy.array([durations[actId] for actId in scheduled], dtype = float)
+		requirements = numpy.array([activities[actId].resources for actId in scheduled], dtype = int).reshape(len(scheduled), len(self.instance.resources))
+
+		times = numpy.unique(numpy.concatenate((starts, ends)))
+		difference = numpy.zeros((len(times), len(self.instance.resources)), dtype = int)
+		numpy.add.at(difference, numpy.searchsorted(times, starts), requirements)
+		numpy.subtract.at(difference, numpy.searchsorted(times, ends), requirements)
+		return (times, numpy.cumsum(difference, axis = 0))
+
+	def getTotalUsage(self, until):
+		"""Returns for each resource its usage summed over the time interval [0, until)"""
+		(times, usage) = self.getUsageProfile()
+		lengths = numpy.diff(numpy.clip(times, 0, until))
+		return [float(total) for total in (usage[:-1] * lengths[:, None]).sum(axis = 0)]
+
+	def getPeakUsage(self, startTimes = None, durations = None):
+		"""Returns for each resource the highest usage, of this solution or of the given start times and durations"""
+		(times, usage) = self.getUsageProfile(startTimes, durations)
+		return [int(peak) for peak in usage.max(axis = 0)] if len(times) > 0 else [0] * len(self.instance.resources)
+
+	def isResourceFeasible(self, startTimes = None, durations = None):
+		"""Returns whether the resource usage stays within the capacities at all times, for this solution or for the given start times and durations"""
+		(times, usage) = self.getUsageProfile(startTimes, durations)
+		return bool((usage <= numpy.array(self.instance.resources, dtype = int)).all())
+
+	def setStartTime(self, actId, time):
+		"""Sets the start time of an activity and registers its usage in the resource profile"""
+		self.startTimes[actId] = time
+		self.profile.addActivity(self.instance.activities[actId], time)
+
+	def setStartTimes(self, startTimes):
+		"""Replaces all start times and rebuilds the resource profile"""
+		self.reset()
+		for (actId, time) in enumerate(startTimes):
+			if time > -1:
+				self.setStartTime(actId, time)
+
 	def reset(self):
 		self.startTimes = [-1] * len(self.instance.activities)
+		self.profile = ResourceProfile(self.instance.resources)
+
+	def clear(self):
+		"""Unschedules all activities like reset, but reuses the start time array and the resource profile.
+		References to the old start times see the change."""
+		startTimes = self.startTimes
+		for actId in range(len(startTimes)):
+			startTimes[actId] = -1
+		self.profile.clear()
@@ -1,24 +1,32 @@
 #! /usr/bin/python
 
+import numpy
+
 class Testdata:
 	def __init__(self, pos):
 		self.pos = pos
 		self.results = {}
 
 	def addTest(self, delayfilename):
-		from solver import solve
-		f = open(delayfilename, 'r')
-		delays = map(float, list(f))
-		f.close()
+		self.addTests([delayfilename])
 
-		delayedProblem = self.pos.clone()
-		for (index, act) in enumerate(delayedProblem.activities):
-			act.time *= delays[index]
-			
-		toSolve = {'options':{'solver':"noResources"},'instance':delayedProblem}
-		delayedSolution = solve(toSolve)
+	def addTests(self, delayfilenames, chunkSize = 1000, delays = None):
+		"""Computes the delayed start times for all delay files.
+		The scenarios are loaded as a (scenarios x activities) duration matrix and solved in one pass,
+		in chunks of at most chunkSize scenarios to bound memory use.
+		If a dictionary of already loaded delays is given, the files are not read again."""
+		if delays == None:
+			delays = {}
+		n = len(self.pos.activities)
+		baseDurations = numpy.array([act.time for act in self.pos.activities])
+		longestPath = self.pos.getLongestPath()
 
-		self.results[delayfilename] = delayedSolution.startTimes
+		for first in range(0, len(delayfilenames), chunkSize):
+			chunk = delayfilenames[first:first + chunkSize]
+			delayMatrix = numpy.array([(delays.get(delayfilename) or readDelays(delayfilename))[:n] for delayfilename in chunk])
+			delayedStartTimes = longestPath.earliestStarts(baseDurations * delayMatrix)
+			for (delayfilename, startTimes) in zip(chunk, delayedStartTimes):
+				self.results[delayfilename] = startTimes.tolist()
 
 	def writeToFile(self, filename):
 		outfile = open(filename, 'w')
@@ -40,3 +48,8 @@ class Testdata:
 		infile.close()
 		return newTestdata
 
+def readDelays(delayfilename):
+	f = open(delayfilename, 'r')
+	delays = map(float, list(f))
+	f.close()
+	return delays
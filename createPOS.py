@@ -1,10 +1,12 @@
 from chainer import chain
 from flexopt import flexopt
 
+flowChainers = ['flow_opt', 'flow_opt_infer']
+
 def createPOS(data):
 	options = data['options']
 	chainOption = options['chainer']
-	if chainOption == 'flow_opt' or chainOption == 'flow_opt_infer':
+	if chainOption in flowChainers:
 		return flexopt(data)
 	else:
 		return chain(data)
@@ -1,4 +1,10 @@
-from gurobipy import *
+import time, random
+from classes.LinearModel import LinearModel
+from milp import solveModel
+from chainer import chooseFilters, chainPolicella
+
+# the least time (in seconds) for which the model is solved again with inference constraints
+minimumTimeSlice = 5.0
 
 def flexopt(data):
 	instance = data['instance']
@@ -10,57 +16,28 @@ def flexopt(data):
 	pos = instance.clone()
 	inferTransitiveConstraints = (chainOption == 'flow_opt_infer')
 
-	chainFlow(pos, solution, instance, inferTransitiveConstraints, debug = options['debug'])
+	# the resource flow of a heuristic chainer can be used as a MIP start
+	flows = None
+	heuristicPOS = None
+	if options.get('warmstart', '') != '':
+		flows = {}
+		heuristicPOS = chainPolicella(instance, solution, chooseFilters(options['warmstart']), rng = random.Random(0), flows = flows)
+
+	chainFlow(pos, solution, instance, inferTransitiveConstraints, debug = options['debug'], backend = options.get('milp', 'gurobi'), flows = flows, heuristicPOS = heuristicPOS)
 
 	return pos
 	
 
-def chainFlow(pos, solution, instance, inferImplicitConstraints = False, debug = False):
-	# set up gurobi model
-	m = Model("flowmodel")
-	if not debug:
-		m.setParam(GRB.Param.OutputFlag, 0) # turn off output
-	m.setParam(GRB.Param.TimeLimit, 15.0 * 60) # limit execution time to 15 minutes
+def chainFlow(pos, solution, instance, inferImplicitConstraints = False, debug = False, backend = 'gurobi', flows = None, heuristicPOS = None):
+	# set up model
+	buildStart = time.time()
+	m = LinearModel("flowmodel")
 
 	# create ordering of activities
 	timedActivities = sorted(zip(solution.startTimes, range(len(solution.startTimes))))
 
-	# maintain sets of predecessors, successors and current activities
-	predecessors = set()
-	current = set()
-	successors = set(range(len(timedActivities)))
-
 	# build model
-	i = 0
-	sourceLinks = [[] for x in range(len(instance.resources))]
-	sinkLinks = [[] for x in range(len(instance.resources))]
-	crossLinks = [([None] * len(timedActivities)) for x in range(len(timedActivities))]
-	crossLinkVars = [([None] * len(timedActivities)) for x in range(len(timedActivities))]
-	while i < len(timedActivities):
-		# get time of next activities
-		(time, _) = timedActivities[i]
-
-		# Move items from current set to predecessor set that are done
-		done = {act for act in current if (solution.startTimes[act] + instance.activities[act].time <= time)}
-		predecessors |= done
-		current -= done
-
-		# Move items from succesor set to current set that start at the current time
-		newActs = set()
-		while i < len(timedActivities) and timedActivities[i][0] == time:
-			newActs.add(timedActivities[i][1])
-			i += 1
-		current |= newActs
-		successors -= newActs
-
-		# build the gurobi model with new activities
-		for newAct in newActs:
-			createLinksForActivity(m, newAct, predecessors, successors, instance, sourceLinks, sinkLinks, crossLinks, crossLinkVars)
-
-	# limit resource capacity
-	for rId, cap in enumerate(instance.resources):
-		addConstraint(m, [1.0] * len(sourceLinks[rId]), sourceLinks[rId], GRB.LESS_EQUAL, float(cap) + 0.01, "resource_{0}_cap".format(rId))
-		addConstraint(m, [1.0] * len(sinkLinks[rId]), sinkLinks[rId], GRB.LESS_EQUAL, float(cap) + 0.01, "resource_{0}_cap".format(rId))
+	(crossLinkVars, flowVariable) = createLinks(m, timedActivities, instance, debug)
 
 	# set existing links to 1
 	for (actId, act) in enumerate(instance.activities):
@@ -71,112 +48,182 @@ def chainFlow(pos, solution, instance, inferImplicitConstraints = False, debug =
 					print "Link from {0} to {1} is not present in model".format(actId, succ)
 					print "Start time of {0}: {2}, end time of {0}: {3}, start time of {1}: {4}".format(actId, succ, solution.startTimes[actId], solution.startTimes[actId] + instance.activities[actId].time, solution.startTimes[succ])
 			else:
-				addConstraint(m, [1.0], [crossLinkVars[actId][succ]], GRB.EQUAL, 1.0, "constraint_{0}_{1}".format(actId, succ))
+				addConstraint(m, [1.0], [crossLinkVars[actId][succ]], '=', 1.0, "constraint_{0}_{1}".format(actId, succ))
 	
-	# infer transitive connections
+	# start from the flow of the heuristic POS
+	if flows != None:
+		m.start = createStart(m.numVariables(), crossLinkVars, flowVariable, instance, flows, heuristicPOS, inferImplicitConstraints)
+		if m.start == None:
+			print "The flow of the heuristic POS is not possible in the model, starting without it"
+		else:
+			pos.statistics['warmStartObjective'] = sum([m.start[var] for toIds in crossLinkVars for var in toIds if var != None])
+
+	buildSeconds = time.time() - buildStart
+
+	# solve the model, limiting execution time to 15 minutes
+	timeLimit = 15.0 * 60
+	startTime = time.time()
+	values = solveModel(m, backend, timeLimit, debug)
+	solveSeconds = time.time() - startTime
+	if 'firstIncumbentSeconds' in m.statistics:
+		pos.statistics['firstIncumbentSeconds'] = m.statistics['firstIncumbentSeconds']
+
+	# infer transitive connections: add the inference constraints violated by the solution and solve again,
+	# until the solution violates none of them or the time left is less than the minimum time slice
 	if inferImplicitConstraints:
-		n = len(instance.activities)
-		for i in range(n):
-			time_i, actId_i = timedActivities[i]
-			end_i = time_i + instance.activities[actId_i].time
-			for j in range(i + 1, n):
-				time_j, actId_j = timedActivities[j]
-				if end_i > time_j:
-					continue
-				end_j = time_j + instance.activities[actId_j].time
-				for k in range(j + 1, n):
-					time_k, actId_k = timedActivities[k]
-					if end_j > time_k:
-						continue
-					# for i, j, k such that i before j and j before k: if i->j and j->k, i->k
-					linkA = crossLinkVars[actId_i][actId_j]
-					linkB = crossLinkVars[actId_j][actId_k]
-					linkC = crossLinkVars[actId_i][actId_k]
-					if linkA and linkB and linkC:
-						addConstraint(m, [1.0, 1.0, -1.0], [linkA, linkB, linkC], GRB.LESS_EQUAL, 1.0, "inference_{0}_{1}_{2}".format(actId_i, actId_j, actId_k))
-
-				
-
-
-	m.update()
-
-	m.optimize()
-
-	if m.status == GRB.INFEASIBLE:
-		raise Exception("Model infeasible")
+		rounds = 0
+		inferences = 0
+		position = [0] * len(timedActivities)
+		for (i, (time_i, actId_i)) in enumerate(timedActivities):
+			position[actId_i] = i
+		while True:
+			violated = findViolatedInferences(values, crossLinkVars, solution, instance, position)
+			remaining = timeLimit - (time.time() - startTime)
+			if len(violated) == 0 or remaining < minimumTimeSlice:
+				break
+			buildStart = time.time()
+			for (actId_i, actId_j, actId_k) in violated:
+				# for i, j, k such that i before j and j before k: if i->j and j->k, i->k
+				linkA = crossLinkVars[actId_i][actId_j]
+				linkB = crossLinkVars[actId_j][actId_k]
+				linkC = crossLinkVars[actId_i][actId_k]
+				addConstraint(m, [1.0, 1.0, -1.0], [linkA, linkB, linkC], '<', 1.0, "inference_{0}_{1}_{2}".format(actId_i, actId_j, actId_k))
+			rounds += 1
+			inferences += len(violated)
+			buildSeconds += time.time() - buildStart
+
+			solveStart = time.time()
+			values = solveModel(m, backend, remaining, debug)
+			solveSeconds += time.time() - solveStart
+		if len(violated) > 0:
+			print "Time is up with {0} inference constraints violated, the POS may lack transitive constraints".format(len(violated))
+		pos.statistics.update({'inferenceRounds': rounds, 'inferenceConstraints': inferences, 'violatedInferences': len(violated), 'converged': int(len(violated) == 0)})
+	pos.statistics.update({'buildSeconds': buildSeconds, 'solveSeconds': solveSeconds, 'objective': m.statistics['objective'], 'gap': m.statistics['gap']})
 
 	# read solution into POS
 	for fromId, toIds in enumerate(crossLinkVars):
 		for toId, var in enumerate(toIds):
 			if not(var == None):
-				if var.X > 0.5:
+				if values[var] > 0.5:
 					pos.addPrecedenceConstraint(fromId, toId)
 
-def createLinksForActivity(m, newAct, predecessors, successors, instance, sourceLinks, sinkLinks, crossLinks, crossLinkVars):
-	resourceInLinks = [[] for x in range(len(instance.resources))]
-	resourceOutLinks = [[] for x in range(len(instance.resources))]
-
-	# source and sink links
-	for rId, cap in enumerate(instance.resources):
-		sourceLink = m.addVar(0.0, cap, 0, GRB.CONTINUOUS, "s_{0}_{1}".format(newAct, rId))
-		sourceLinks[rId].append(sourceLink)
-		resourceInLinks[rId].append(sourceLink)
-
-		sinkLink = m.addVar(0.0, cap, 0, GRB.CONTINUOUS, "t_{0}_{1}".format(newAct, rId))
-		sinkLinks[rId].append(sinkLink)
-		resourceOutLinks[rId].append(sinkLink)
-
-	# links from all possible predecessors
-	for pred in predecessors:
-		resourceLinks = createLink(m, instance, pred, newAct, crossLinks, crossLinkVars)
-		map(list.append, resourceInLinks, resourceLinks)
-
-	# links to all possible successors
-	for succ in successors:
-		resourceLinks = createLink(m, instance, newAct, succ, crossLinks, crossLinkVars)
-		map(list.append, resourceOutLinks, resourceLinks)
+def findViolatedInferences(values, crossLinkVars, solution, instance, position):
+	"""Returns the (i, j, k) triples of activities, chained in that order, for which the solution has links i->j and j->k but not i->k"""
+	n = len(crossLinkVars)
+	startTimes = solution.startTimes
+	endTimes = [startTimes[actId] + instance.activities[actId].time for actId in range(n)]
+
+	chosen = [[toId for (toId, var) in enumerate(toIds) if var != None and values[var] > 0.5] for toIds in crossLinkVars]
+	chosenPredecessors = [[] for actId in range(n)]
+	for (fromId, toIds) in enumerate(chosen):
+		for toId in toIds:
+			chosenPredecessors[toId].append(fromId)
+
+	violated = []
+	for j in range(n):
+		for i in chosenPredecessors[j]:
+			if position[i] > position[j] or endTimes[i] > startTimes[j]:
+				continue
+			for k in chosen[j]:
+				if position[j] > position[k] or endTimes[j] > startTimes[k]:
+					continue
+				linkC = crossLinkVars[i][k]
+				if linkC != None and values[linkC] <= 0.5:
+					violated.append((i, j, k))
+	return violated
+
+def createLinks(m, timedActivities, instance, debug = False):
+	"""Adds all variables and flow constraints to the model, in batches. An activity can be linked to every activity that starts later.
+	Variables and constraints are only named when debugging.
+	Returns a matrix with the index of the link variable from one activity to another (None if they cannot be linked),
+	and a function returning the index of the flow variable from one activity to another for a resource."""
+	n = len(timedActivities)
+	resources = map(float, instance.resources)
+	numResources = len(resources)
+	startTimes = [0] * n
+	for (startTime, actId) in timedActivities:
+		startTimes[actId] = startTime
+	endTimes = [startTimes[actId] + instance.activities[actId].time for actId in range(n)]
+	names = lambda nameFormat, keys: [nameFormat.format(*key) for key in keys] if debug else None
+
+	links = [(fromId, toId) for (fromTime, fromId) in timedActivities for (toTime, toId) in timedActivities if fromTime < toTime]
+	numLinks = len(links)
+	linkResources = [(fromId, toId, rId) for (fromId, toId) in links for rId in range(numResources)]
+	actResources = [(actId, rId) for actId in range(n) for rId in range(numResources)]
+
+	# a variable to register whether there is a link, a flow variable for each link and resource,
+	# and source and sink flow variables for each activity and resource
+	linkStart = m.addVariables([0.0] * numLinks, [1.0] * numLinks, [1.0] * numLinks, True, names("{0}_{1}", links))
+	flowStart = m.addVariables([0.0] * len(linkResources), resources * numLinks, [0.0] * len(linkResources), False, names("{0}_{1}_{2}", linkResources))
+	sourceStart = m.addVariables([0.0] * len(actResources), resources * n, [0.0] * len(actResources), False, names("s_{0}_{1}", actResources))
+	sinkStart = m.addVariables([0.0] * len(actResources), resources * n, [0.0] * len(actResources), False, names("t_{0}_{1}", actResources))
+
+	# force each link variable to 1 if any of its flows is set
+	rows = [link for link in range(numLinks) for rId in range(numResources + 1)]
+	cols = [flowStart + link * numResources + rId if rId < numResources else linkStart + link for link in range(numLinks) for rId in range(numResources + 1)]
+	values = ([1.0] * numResources + [-sum(resources)]) * numLinks
+	m.addConstraints(rows, cols, values, [float('-inf')] * numLinks, [0.01] * numLinks, names("{0}_{1}_collector", links))
 
 	# set sum of in links = sum of out links = required capacity for the activity
-	m.update()
-	for rId, req in enumerate(instance.activities[newAct].resources):
-		addConstraint(m, [1.0] * len(resourceInLinks[rId]), resourceInLinks[rId], GRB.EQUAL, float(req), "{0}_in_{1}_cap".format(newAct, rId))
-		addConstraint(m, [1.0] * len(resourceOutLinks[rId]), resourceOutLinks[rId], GRB.EQUAL, float(req), "{0}_out_{1}_cap".format(newAct, rId))
-
-def createLink(m, instance, fromId, toId, crossLinks, crossLinkVars):
-	resourceLinks = []
-	# create new if needed
-	if crossLinks[fromId][toId] == None:
-		# variable to register whether there is a link or not
-		linkVar = m.addVar(0.0, 1.0, 1.0, GRB.BINARY, "{0}_{1}".format(fromId, toId))
-		crossLinkVars[fromId][toId] = linkVar
-		crossLinks[fromId][toId] = [None] * len(instance.resources)
-
-		# for each resource create new variable
-		totCap = 0
-		for rId, cap in enumerate(instance.resources):
-			resourceLink = m.addVar(0.0, float(cap), 0.0, GRB.CONTINUOUS, "{0}_{1}_{2}".format(fromId, toId, rId))
-			crossLinks[fromId][toId][rId] = resourceLink
-			resourceLinks.append(resourceLink)
-			totCap += cap
-		m.update()
-
-		# force linkVar to 1 if any of the resource links is set
-		links = resourceLinks[:]
-		weights = [1.0] * len(links)
-
-		links.append(linkVar)
-		weights.append(-1.0 * totCap)
-
-		addConstraint(m, weights, links, GRB.LESS_EQUAL, 0.01, "{0}_{1}_collector".format(fromId, toId))
-	else:
-		resourceLinks = crossLinks[fromId][toId][:]
-	return resourceLinks
+	# the in links of an activity are the links from the activities that are done when it starts
+	rows = [2 * act + side for act in range(len(actResources)) for side in range(2)]
+	cols = [start + act for act in range(len(actResources)) for start in [sourceStart, sinkStart]]
+	for (link, (fromId, toId)) in enumerate(links):
+		done = endTimes[fromId] <= startTimes[toId]
+		for rId in range(numResources):
+			rows.append(2 * (fromId * numResources + rId) + 1)
+			cols.append(flowStart + link * numResources + rId)
+			if done:
+				rows.append(2 * (toId * numResources + rId))
+				cols.append(flowStart + link * numResources + rId)
+	required = [float(instance.activities[actId].resources[rId]) for (actId, rId) in actResources for side in range(2)]
+	m.addConstraints(rows, cols, [1.0] * len(rows), required, required, names("{0}_{2}_{1}_cap", [(actId, rId, side) for (actId, rId) in actResources for side in ['in', 'out']]))
+
+	# limit resource capacity
+	rows = [2 * rId + side for actId in range(n) for rId in range(numResources) for side in range(2)]
+	cols = [start + act for act in range(len(actResources)) for start in [sourceStart, sinkStart]]
+	capacities = [cap + 0.01 for cap in resources for side in range(2)]
+	m.addConstraints(rows, cols, [1.0] * len(rows), [float('-inf')] * len(capacities), capacities, names("resource_{0}_cap", [(rId,) for rId in range(numResources) for side in range(2)]))
+
+	crossLinkVars = [([None] * n) for x in range(n)]
+	for (link, (fromId, toId)) in enumerate(links):
+		crossLinkVars[fromId][toId] = linkStart + link
+
+	def flowVariable(fromId, toId, rId):
+		"""Returns the index of a flow variable, with -1 as fromId for the source and as toId for the sink, None if there is no such variable"""
+		if fromId == -1:
+			return sourceStart + toId * numResources + rId
+		if toId == -1:
+			return sinkStart + fromId * numResources + rId
+		if crossLinkVars[fromId][toId] == None:
+			return None
+		return flowStart + (crossLinkVars[fromId][toId] - linkStart) * numResources + rId
+
+	return (crossLinkVars, flowVariable)
+
+def createStart(numVariables, crossLinkVars, flowVariable, instance, flows, heuristicPOS, inferImplicitConstraints = False):
+	"""Returns the solution of the model given by the resource flow of a heuristic POS, or None if the model does not contain the flow.
+	Links are set for the flow and for the existing constraints; when inferring, for every path in the heuristic POS."""
+	start = [0.0] * numVariables
+	for ((fromId, toId, rId), units) in flows.iteritems():
+		var = flowVariable(fromId, toId, rId)
+		if var == None:
+			return None
+		start[var] = float(units)
+		if fromId != -1 and toId != -1:
+			start[crossLinkVars[fromId][toId]] = 1.0
+
+	for (fromId, toIds) in enumerate(crossLinkVars):
+		for (toId, var) in enumerate(toIds):
+			if var != None and (toId in instance.activities[fromId].successors or (inferImplicitConstraints and heuristicPOS.containsPath(fromId, toId))):
+				start[var] = 1.0
+	return start
 
 def addConstraint(model, weights, links, sign, rhs, name, debug=False):
 	# add constraint
-	model.addConstr(LinExpr(weights, links), sign, rhs, name)
+	model.addConstraint(weights, links, sign, rhs, name)
 	# debug
 	if debug:
-		lhs = " + ".join(map(lambda w, l: "%.0f*%s" % (w, l.VarName), weights, links))
+		lhs = " + ".join(map(lambda w, l: "%.0f*%s" % (w, model.varNames[l]), weights, links))
 		print lhs, sign, rhs, "(", name, ")"
 
@@ -0,0 +1,138 @@
+import random, time
+from classes.Solution import Solution
+from solver import solveSerial, improveFBI, latestPredecessorEndtime
+from sampling import parseBudget, regretSelector
+
+##
+## ACTIVITY LIST ENCODING
+## An individual is a precedence feasible list of activity ids, decoded with the serial SGS.
+##
+def decodeActivityList(solution, activityList):
+	"""Schedules the activities in the order of the list, each at its earliest precedence and resource feasible time.
+	Unlike solveSerial, no eligible lists are built, and the start times and resource profile of the solution are reused."""
+	solution.clear()
+	activities = solution.instance.activities
+	for actId in activityList:
+		act = activities[actId]
+		time = solution.profile.earliestFeasibleStart(act, latestPredecessorEndtime(solution, act))
+		solution.setStartTime(actId, time)
+
+def encodeSchedule(solution, topologicalRank):
+	"""Returns the activity list of a schedule: the activities ordered by start time"""
+	startTimes = solution.startTimes
+	activities = solution.instance.activities
+	key = lambda actId: (startTimes[actId], startTimes[actId] + activities[actId].time, topologicalRank[actId])
+	return sorted(range(len(startTimes)), key = key)
+
+def sampleActivityList(solution, selector):
+	"""Creates a schedule with the serial SGS and returns the order in which the activities were scheduled"""
+	activityList = []
+	def recordingSelector(todo):
+		index = selector(todo)
+		activityList.append(todo[index])
+		return index
+	solution.clear()
+	solveSerial(solution, selector = recordingSelector)
+	return activityList
+
+##
+## GENETIC OPERATORS
+##
+def crossover(father, mother, rng):
+	"""Two-point crossover: the head of the father, followed by the mother's order of the remaining activities up to the second point,
+	followed by the father's order of the rest. The child is precedence feasible if both parents are."""
+	n = len(father)
+	(first, second) = sorted([rng.randint(0, n), rng.randint(0, n)])
+	taken = [False] * n
+	child = father[:first]
+	for actId in child:
+		taken[actId] = True
+	for parent, length in [(mother, second), (father, n)]:
+		for actId in parent:
+			if len(child) >= length:
+				break
+			if not taken[actId]:
+				taken[actId] = True
+				child.append(actId)
+	return child
+
+def mutate(activityList, activities, probability, rng):
+	"""Swaps neighbouring activities with the given probability, if they are not precedence related"""
+	for i in range(len(activityList) - 1):
+		if rng.random() < probability and not activityList[i] in activities[activityList[i + 1]].predecessors:
+			(activityList[i], activityList[i + 1]) = (activityList[i + 1], activityList[i])
+
+##
+## GENETIC ALGORITHM
+##
+def solveGenetic(solution, priorities, budget = '1000', populationSize = 40, mutationProbability = 0.05, seed = 0):
+	"""Activity list genetic algorithm with forward-backward improvement of every individual.
+	The budget counts all schedules generated, including the two passes of each improvement; it is checked before every
+	individual, so it is only exceeded when it does not even allow the first individual.
+	Statistics on the run are stored in solution.statistics."""
+	(numSchedules, timeLimit) = parseBudget(budget)
+	instance = solution.instance
+	rng = random.Random(seed)
+	topologicalRank = [0] * len(instance.activities)
+	for (rank, actId) in enumerate(instance.getTopologicalOrdering()):
+		topologicalRank[actId] = rank
+
+	stats = {'schedules': 0, 'generations': 0, 'best': None}
+	startTime = time.time()
+	curve = []
+	# the buffers of these solutions are reused by every decode and improvement
+	work = Solution(instance)
+	backward = Solution(instance.getReversedView())
+	decoded = list(work.startTimes)
+
+	def budgetLeft():
+		"Returns whether the budget allows another individual: a decoded schedule and its two improvement passes"
+		return (numSchedules == None or stats['schedules'] + 3 <= numSchedules) and (timeLimit == None or time.time() - startTime < timeLimit)
+
+	def improve(activityList):
+		"Applies forward-backward improvement to the decoded list in work, returns the (possibly improved) individual"
+		makespan = work.getMakespan()
+		decoded[:] = work.startTimes
+		startTimes = decoded
+		improveFBI(work, backward = backward)
+		stats['schedules'] += 3
+		if work.getMakespan() < makespan:
+			makespan = work.getMakespan()
+			startTimes = work.startTimes
+			activityList = encodeSchedule(work, topologicalRank)
+		if len(curve) == 0 or makespan < curve[-1][1]:
+			curve.append((time.time() - startTime, makespan))
+			stats['best'] = startTimes[:]
+		return (makespan, activityList)
+
+	# initial population from biased random sampling
+	selector = regretSelector(priorities, rng)
+	population = []
+	while len(population) < populationSize and (len(population) == 0 or budgetLeft()):
+		population.append(improve(sampleActivityList(work, selector)))
+
+	# generations
+	while len(population) > 1 and budgetLeft():
+		rng.shuffle(population)
+		children = []
+		for i in range(0, len(population) - 1, 2):
+			if not budgetLeft():
+				break
+			father = population[i][1]
+			mother = population[i + 1][1]
+			for child in [crossover(father, mother, rng), crossover(mother, father, rng)]:
+				if not budgetLeft():
+					break
+				mutate(child, instance.activities, mutationProbability, rng)
+				decodeActivityList(work, child)
+				children.append(improve(child))
+		population = sorted(population + children, key = lambda individual: individual[0])[:populationSize]
+		stats['generations'] += 1
+
+	solution.setStartTimes(stats['best'])
+	seconds = time.time() - startTime
+	solution.statistics['schedules'] = stats['schedules']
+	solution.statistics['generations'] = stats['generations']
+	solution.statistics['seconds'] = seconds
+	solution.statistics['schedulesPerSecond'] = stats['schedules'] / seconds if seconds > 0 else 0.0
+	solution.statistics['bestMakespanCurve'] = curve
@@ -0,0 +1,45 @@
+import os.path, re
+from math import ceil
+
+def criticalPathBound(instance):
+	"LB0: the length of the critical path, ignoring resources"
+	return instance.getCriticalPath().length
+
+def resourceBound(instance):
+	"The total work on each resource divided by its capacity, rounded up"
+	bound = 0
+	for (rId, cap) in enumerate(instance.resources):
+		if cap > 0:
+			work = sum([act.time * act.resources[rId] for act in instance.activities])
+			bound = max(bound, int(ceil(float(work) / cap)))
+	return bound
+
+def lowerBound(instance):
+	return max(criticalPathBound(instance), resourceBound(instance))
+
+def loadBestKnown(filename):
+	"""Reads a PSPLIB solution file (such as j30opt.sm or j60hrs.sm) into a dictionary,
+	mapping instance names (such as 'j301_1') to the makespan in the third column"""
+	size = re.match(r'j(\d+)', os.path.basename(filename)).group(1)
+	bestKnown = {}
+	infile = open(filename, 'r')
+	for line in infile:
+		parts = line.split()
+		if len(parts) >= 3 and all([part.isdigit() for part in parts[:3]]):
+			bestKnown['j{0}{1}_{2}'.format(size, parts[0], parts[1])] = int(parts[2])
+	infile.close()
+	return bestKnown
+
+def getBestKnown(instance, boundsFilename):
+	"""Returns the best-known makespan of the instance, or None if there is no bounds file or it does not list the instance"""
+	if not boundsFilename:
+		return None
+	name = os.path.splitext(os.path.basename(instance.name))[0]
+	return loadBestKnown(boundsFilename).get(name)
+
+def targetMakespan(instance, boundsFilename = ''):
+	"""Returns the makespan at which a solver can stop searching: the best-known makespan if available, the lower bound otherwise"""
+	bestKnown = getBestKnown(instance, boundsFilename)
+	if bestKnown != None:
+		return max(bestKnown, lowerBound(instance))
+	return lowerBound(instance)
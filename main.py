@@ -9,22 +9,35 @@ from classes.Solution import Solution
 from classes.Testdata import Testdata
 from classes.Pipeline import Pipeline
 from solver import solve
-from createPOS import createPOS
-from tester import test
+from createPOS import createPOS, flowChainers
+from chainer import namedFilters, sampleObjectives
+from tester import test, loadDelays
 from reporter import report
+from priorityRules import namedRules
+from milp import milpBackends
 
 Option = namedtuple('Option', 'key values default description')
 
 optionConfig = {
-	's': Option('solver', ['serial', 'parallel', 'serialFBI', 'parallelFBI', 'shortest'], 'serial', 'The solver to use'),
-	'c': Option('chainer', [], 'random', 'The chainer to use'),
+	's': Option('solver', ['serial', 'parallel', 'serialFBI', 'parallelFBI', 'serialIterFBI', 'parallelIterFBI', 'shortest', 'sampling', 'genetic'] + ['{0}{1}'.format(sgs, tag) for sgs in ['serial', 'parallel', 'sampling'] for (tag, rule) in namedRules], 'serial', 'The solver to use'),
+	'c': Option('chainer', [], 'random', 'The chainer to use, a comma separated list of chainers, or "all"'),
 	't': Option('testset', [], 'exp2', 'The delay datacollection to use'),
-	'o': Option('output', [], 'output', 'The folder to place output files.')
+	'o': Option('output', [], 'output', 'The folder to place output files.'),
+	'b': Option('budget', [], '1000', 'The schedule budget of the sampling and genetic solvers: a number of schedules, or a number of seconds followed by "s"'),
+	'l': Option('bounds', [], '', 'A PSPLIB file with best-known makespans (such as j30opt.sm)'),
+	'n': Option('samples', [], '1', 'The number of seeded chaining samples, of which the best POS is kept'),
+	'r': Option('seed', [], '', 'The seed of the first chaining sample; a recorded seed regenerates its POS when used with 1 sample'),
+	'm': Option('objective', sampleObjectives, 'flex', 'The score used to select the best chaining sample'),
+	'p': Option('milp', milpBackends, 'gurobi', 'The MILP solver used by the flow_opt chainers'),
+	'w': Option('warmstart', [], '', 'A chainer (such as maxCCminID) whose resource flow is the MIP start of the flow_opt chainers')
 }
 
 flagConfig = {
 	'st': 'Disable pooling and use only one thread',
-	'debug': 'Show debug data'
+	'debug': 'Show debug data',
+	'earlyexit': 'Stop the shortest solver as soon as a schedule meets the lower bound or best-known makespan',
+	'skipimplied': 'Do not add chaining constraints that are already implied by the POS',
+	'reducepos': 'Write the POS in transitively reduced form'
 }
 
 def showUsage():
@@ -45,37 +58,88 @@ with instance(s) being the path(s) to one or more instance files.
 	for flag, description in flagConfig.iteritems():
 		print '  --{0}: {1}'.format(flag, description)
 
-def getFilenames(instanceFilename):
-	global options
+def getFilenames(instanceFilename, options):
 	basename = os.path.basename(instanceFilename)
 	outfolder = options['output']
 	testsetname = options['testset'].replace("/",".")
+	solver = getSolverName(options)
+	chainer = getChainerName(options)
 	names = {
 		'instance': instanceFilename,
-		'solution': "{0}/solution/{1}.sol_{2}".format(outfolder, basename, options['solver']),
-		'pos': "{0}/pos/{1}.sol_{2}.chain_{3}".format(outfolder, basename, options['solver'], options['chainer']),
-		'testdata': "{0}/testdata/{1}.sol_{2}.chain_{3}.test_{4}".format(outfolder, basename, options['solver'], options['chainer'], testsetname),
-		'report': "{0}/report/{1}.sol_{2}.chain_{3}.test_{4}.report".format(outfolder, basename, options['solver'], options['chainer'], testsetname)
+		'solution': "{0}/solution/{1}.sol_{2}".format(outfolder, basename, solver),
+		'pos': "{0}/pos/{1}.sol_{2}.chain_{3}".format(outfolder, basename, solver, chainer),
+		'testdata': "{0}/testdata/{1}.sol_{2}.chain_{3}.test_{4}".format(outfolder, basename, solver, chainer, testsetname),
+		'report': "{0}/report/{1}.sol_{2}.chain_{3}.test_{4}.report".format(outfolder, basename, solver, chainer, testsetname)
 	}
 	return names
 
-
-def processInstance(filename):
+def getSolverName(options):
+	"""Returns the solver part of the output filenames, including the budget or early exit when the solver uses them"""
+	name = options['solver']
+	if name.startswith('sampling') or name == 'genetic':
+		name += '.budget_{0}'.format(options['budget'])
+	if name == 'shortest' and options['earlyexit']:
+		# the early exit target depends on the best-known makespans, when they are given
+		name += '.earlyexit'
+		if options['bounds'] != '':
+			name += '_' + os.path.basename(options['bounds'])
+	return name
+
+def getChainerName(options):
+	"""Returns the chainer part of the output filenames, including the options that affect the chosen chainer"""
+	name = options['chainer']
+	if name in flowChainers:
+		if options['milp'] != 'gurobi':
+			name += '.' + options['milp']
+		if options['warmstart'] != '':
+			name += '.warm_' + options['warmstart']
+		return name
+	if options['samples'] != '1':
+		name += '.samples_{0}_{1}'.format(options['samples'], options['objective'])
+	if options['seed'] != '':
+		name += '.seed_{0}'.format(options['seed'])
+	if options['skipimplied']:
+		name += '.skipimplied'
+	if options['reducepos']:
+		name += '.reduced'
+	return name
+
+def getChainers(chainOption):
+	"""Returns the list of chainers in the chainer option: a comma separated list, or 'all' for every named filter and the flow models"""
+	if chainOption == 'all':
+		return [tag for (tag, filt) in namedFilters] + flowChainers
+	return chainOption.split(',')
+
+def prepareInstance(filename):
+	"""Loads the instance and the solution that are shared by all chainers, creating the solution if it is not on file yet.
+	Returns the filename and the data, with whether the solution was recreated."""
 	global options
 
-	# get data from files where available
 	data = {'options': options}
-	names = getFilenames(filename)
+	names = getFilenames(filename, options)
 
 	pipeline = Pipeline()
 	pipeline.addJob('instance', names['instance'], Instance, lambda x: None)
 	pipeline.addJob('solution', names['solution'], Solution, solve)
+	data['dirty'] = pipeline.execute(data)
+	return (filename, {key: data[key] for key in ['instance', 'solution', 'dirty']})
+
+def processChainer(job):
+	"""Creates the POS, testdata and report of one chainer for a prepared instance.
+	Only the filename and chainer are passed to the worker: the prepared instances and the delay scenarios are loaded
+	once, before the workers are started, and shared with them."""
+	global options, delays, prepared
+	(filename, chainer) = job
+	data = dict(prepared[filename], options = dict(options, chainer = chainer), delays = delays)
+	names = getFilenames(filename, data['options'])
+
+	pipeline = Pipeline()
 	pipeline.addJob('pos', names['pos'], Instance, createPOS)
 	pipeline.addJob('testdata', names['testdata'], Testdata, test)
 	pipeline.addJob('report', names['report'], Report, report)
-	pipeline.execute(data)
+	pipeline.execute(data, data['dirty'])
 
-	print filename
+	print filename, chainer
 
 def getOptions(flags):
 	options = {}
@@ -108,7 +172,7 @@ def getOptions(flags):
 	
 
 def main():
-	global options
+	global options, delays, prepared
 	try:
 		optionkeys = ''.join(['%s:' % x for x in optionConfig.iterkeys()])
 		flags, args = getopt.getopt(sys.argv[1:], optionkeys, flagConfig.keys())
@@ -122,12 +186,24 @@ def main():
 		return 1
 
 	options = getOptions(flags)
-
-	if options['st']: 
-		map(processInstance, args)
-	else:
-		workers = Pool()
-		workers.map(processInstance, args)
+	delays = loadDelays(options)
+
+	# load and solve every instance once, then fan the chainers of all instances out over the workers,
+	# which are started once the instances are prepared so they share them
+	chainers = getChainers(options['chainer'])
+	usePool = not options['st'] and len(args) * len(chainers) > 1
+	prepared = dict(runPool(prepareInstance, args, usePool and len(args) > 1))
+	runPool(processChainer, [(filename, chainer) for filename in args for chainer in chainers], usePool)
+
+def runPool(function, jobs, usePool):
+	"""Maps the function over the jobs, in a new process pool if usePool is set"""
+	if not usePool:
+		return map(function, jobs)
+	workers = Pool()
+	results = workers.map(function, jobs)
+	workers.close()
+	workers.join()
+	return results
 
 if __name__ == '__main__':
 	sys.exit(main())
@@ -0,0 +1,159 @@
+#! /usr/bin/python
+
+import os, re, shutil, subprocess, tempfile, time
+
+# Backends that solve a LinearModel. The solver packages are imported when a model is solved,
+# so only the backend that is used needs to be installed.
+milpBackends = ['gurobi', 'cbc']
+
+def solveModel(model, backend = 'gurobi', timeLimit = 15.0 * 60, debug = False):
+	"""Solves a LinearModel with the given backend, returns an array with the value of every variable.
+	The backend stores the objective, the relative gap and, where the solver reports it, the time to the first
+	incumbent in the statistics of the model.
+	Raises an exception if the model is infeasible, or if no solution is found within the time limit (in seconds)."""
+	if backend == 'cbc':
+		return solveCbc(model, timeLimit, debug)
+	return solveGurobi(model, timeLimit, debug)
+
+def solveGurobi(model, timeLimit, debug = False):
+	"""Solves the model with Gurobi, starting from the MIP start of the model if it has one"""
+	from gurobipy import Model, LinExpr, GRB
+
+	m = Model(model.name)
+	if not debug:
+		m.setParam(GRB.Param.OutputFlag, 0) # turn off output
+	m.setParam(GRB.Param.TimeLimit, timeLimit)
+
+	variables = []
+	for (lower, upper, objective, integer, name) in zip(model.lower, model.upper, model.objective, model.integer, model.varNames):
+		if not integer:
+			varType = GRB.CONTINUOUS
+		elif lower == 0.0 and upper == 1.0:
+			varType = GRB.BINARY
+		else:
+			varType = GRB.INTEGER
+		variables.append(m.addVar(lower, upper, objective, varType, name))
+	m.update()
+
+	for ((weights, links), lower, upper, name) in zip(model.getRowEntries(), model.rowLower, model.rowUpper, model.rowNames):
+		expr = LinExpr(weights, [variables[var] for var in links])
+		if lower == upper:
+			m.addConstr(expr, GRB.EQUAL, lower, name)
+		elif lower == float('-inf'):
+			m.addConstr(expr, GRB.LESS_EQUAL, upper, name)
+		else:
+			m.addConstr(expr, GRB.GREATER_EQUAL, lower, name)
+	m.update()
+
+	if model.start != None:
+		for (var, value) in zip(variables, model.start):
+			var.Start = value
+
+	# register the time of the first incumbent
+	incumbents = []
+	def callback(cbModel, where):
+		if where == GRB.Callback.MIPSOL and len(incumbents) == 0:
+			incumbents.append(cbModel.cbGet(GRB.Callback.RUNTIME))
+	m.optimize(callback)
+
+	if m.status == GRB.INFEASIBLE:
+		raise Exception("Model infeasible")
+	if m.SolCount == 0:
+		raise Exception("No solution found")
+
+	model.statistics = {'objective': m.ObjVal, 'gap': m.MIPGap, 'seconds': m.Runtime}
+	if len(incumbents) > 0:
+		model.statistics['firstIncumbentSeconds'] = incumbents[0]
+	return [var.X for var in variables]
+
+def solveCbc(model, timeLimit, debug = False):
+	"""Solves the model with CBC, the open source solver that comes with PuLP.
+	PuLP writes the model as an LP file, which is solved by running the CBC executable directly, so its log can be read.
+	The start of the model is passed to CBC as a mipstart file, in the format of a CBC solution file. CBC applies a mipstart
+	to the preprocessed model, where columns may have been removed, so preprocessing is turned off when there is a start."""
+	from pulp import LpProblem, LpVariable, LpConstraint, LpAffineExpression, LpMinimize, LpInteger, LpContinuous
+	from pulp import LpConstraintLE, LpConstraintEQ, LpConstraintGE, PULP_CBC_CMD, COIN_CMD
+
+	bound = lambda value: None if value in [float('inf'), float('-inf')] else value
+	problem = LpProblem(model.name, LpMinimize)
+	variables = [LpVariable('v{0}'.format(var), bound(lower), bound(upper), LpInteger if integer else LpContinuous)
+		for (var, (lower, upper, integer)) in enumerate(zip(model.lower, model.upper, model.integer))]
+	problem += LpAffineExpression([(variables[var], weight) for (var, weight) in enumerate(model.objective) if weight != 0.0])
+	for ((weights, links), lower, upper) in zip(model.getRowEntries(), model.rowLower, model.rowUpper):
+		terms = {}
+		for (weight, var) in zip(weights, links):
+			terms[variables[var]] = terms.get(variables[var], 0.0) + weight
+		if lower == upper:
+			problem += LpConstraint(LpAffineExpression(terms), LpConstraintEQ, rhs = lower)
+			continue
+		if lower != float('-inf'):
+			problem += LpConstraint(LpAffineExpression(terms), LpConstraintGE, rhs = lower)
+		if upper != float('inf'):
+			problem += LpConstraint(LpAffineExpression(terms), LpConstraintLE, rhs = upper)
+
+	solver = PULP_CBC_CMD()
+	if not solver.available():
+		solver = COIN_CMD()
+	if not solver.available():
+		raise Exception("CBC is not available")
+
+	folder = tempfile.mkdtemp()
+	try:
+		modelFile = os.path.join(folder, 'model.lp')
+		solutionFile = os.path.join(folder, 'model.sol')
+		problem.writeLP(modelFile)
+		command = [solver.path, modelFile, 'timeMode', 'elapsed', 'sec', str(timeLimit)]
+		if model.start != None:
+			startFile = os.path.join(folder, 'start.sol')
+			out = open(startFile, 'w')
+			out.write('Feasible - objective value {0!r}\n'.format(sum([weight * value for (weight, value) in zip(model.objective, model.start)])))
+			for (var, value) in enumerate(model.start):
+				out.write('{0} v{0} {1!r}\n'.format(var, value))
+			out.close()
+			command += ['mips', startFile, 'preprocess', 'off']
+		command += ['branch', 'printingOptions', 'all', 'solution', solutionFile]
+		startTime = time.time()
+		log = subprocess.Popen(command, stdout = subprocess.PIPE, stderr = subprocess.STDOUT).communicate()[0]
+		seconds = time.time() - startTime
+		if debug:
+			print log
+
+		if not os.path.isfile(solutionFile):
+			raise Exception("CBC failed: " + log.strip().split('\n')[-1])
+		solutionLines = open(solutionFile).readlines()
+	finally:
+		shutil.rmtree(folder)
+
+	# the first line holds the status, the others the index, name, value and reduced cost of every row and column
+	status = solutionLines[0]
+	if status.startswith('Infeasible') or status.startswith('Integer infeasible'):
+		raise Exception("Model infeasible")
+	if not 'objective value' in status:
+		raise Exception("No solution found")
+	found = {}
+	for line in solutionLines[1:]:
+		parts = line.replace('**', '').split()
+		if len(parts) >= 3:
+			found[parts[1]] = float(parts[2])
+	# variables in no constraint are not written, their value is the bound closest to zero
+	values = [found.get('v{0}'.format(var), min(max(0.0, lower), upper)) for (var, (lower, upper)) in enumerate(zip(model.lower, model.upper))]
+
+	objective = sum([weight * value for (weight, value) in zip(model.objective, values)])
+	gap = 0.0
+	lowerBound = re.search(r'^Lower bound:\s*(\S+)', log, re.MULTILINE)
+	if not status.startswith('Optimal') and lowerBound != None:
+		gap = abs(objective - float(lowerBound.group(1))) / max(abs(objective), 1e-10)
+	model.statistics = {'objective': objective, 'gap': gap, 'seconds': seconds}
+	if model.start != None and not 'mipstart provided solution' in log:
+		print "CBC could not use the start of the model"
+
+	# the first incumbent is an accepted mipstart or an integer solution, at the last time logged on or before its line
+	incumbentSeconds = 0.0
+	for line in log.split('\n'):
+		times = re.findall(r'(\d+\.\d+) seconds', line)
+		if len(times) > 0:
+			incumbentSeconds = float(times[-1])
+		if line.startswith('Cbc0045I mipstart provided solution') or line.startswith('Cbc0012I') or line.startswith('Cbc0004I'):
+			model.statistics['firstIncumbentSeconds'] = incumbentSeconds
+			break
+	return values
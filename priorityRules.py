@@ -0,0 +1,89 @@
+from heapq import heapify, heappush, heappop
+
+##
+## PRIORITY RULES
+## These functions take an instance and return a priority value for every activity.
+## Activities with a lower value are scheduled first, ties are broken by the lowest id.
+##
+def priorityLFT(instance):
+	"Latest finish time"
+	return instance.getCriticalPath().latestFinish[:]
+
+def priorityLST(instance):
+	"Latest start time"
+	return instance.getCriticalPath().latestStart[:]
+
+def priorityMTS(instance):
+	"Most total successors"
+	reachability = instance.getReachability()
+	return [-bin(bits).count('1') for bits in reachability.descendants]
+
+def priorityGRPW(instance):
+	"Greatest rank positional weight: the duration of the activity and its immediate successors"
+	activities = instance.activities
+	return [-(act.time + sum([activities[succ].time for succ in act.successors])) for act in activities]
+
+def priorityMSLK(instance):
+	"Minimum slack"
+	criticalPath = instance.getCriticalPath()
+	return [ls - es for (ls, es) in zip(criticalPath.latestStart, criticalPath.earliestStart)]
+
+def priorityWRUP(instance, successorWeight = 0.7):
+	"Weighted resource utilisation ratio and precedence"
+	def weight(act):
+		utilisation = sum([float(req) / cap for (req, cap) in zip(act.resources, instance.resources) if cap > 0])
+		return successorWeight * len(act.successors) + (1 - successorWeight) * utilisation
+	return [-weight(act) for act in instance.activities]
+
+namedRules = [
+	('LFT', priorityLFT),
+	('LST', priorityLST),
+	('MTS', priorityMTS),
+	('GRPW', priorityGRPW),
+	('MSLK', priorityMSLK),
+	('WRUP', priorityWRUP)
+]
+
+def chooseRule(solverOption):
+	"""Returns the priority rule named in a solver option such as 'serialLFT' or 'parallelMSLKFBI', or None if no rule is named"""
+	for prefix in ['serial', 'parallel', 'sampling']:
+		if solverOption.startswith(prefix):
+			solverOption = solverOption[len(prefix):]
+	for suffix in ['IterFBI', 'FBI']:
+		if solverOption.endswith(suffix):
+			solverOption = solverOption[:-len(suffix)]
+			break
+	for (tag, rule) in namedRules:
+		if solverOption == tag:
+			return rule
+	return None
+
+# List of eligible activities, ordered by priority.
+# It can be used as eligible list of the schedule generation schemes:
+# the activity with the lowest priority value is always at index 0, and popping it takes O(log n).
+# Fields:
+#  priorities: an array with the priority value of every activity
+#  heap: a heap of (priority, actId) tuples
+class PriorityList:
+	def __init__(self, priorities, actIds = []):
+		self.priorities = priorities
+		self.heap = [(priorities[actId], actId) for actId in actIds]
+		heapify(self.heap)
+
+	def __len__(self):
+		return len(self.heap)
+
+	def __getitem__(self, index):
+		return self.heap[index][1]
+
+	def __iadd__(self, actIds):
+		for actId in actIds:
+			heappush(self.heap, (self.priorities[actId], actId))
+		return self
+
+	def pop(self, index = 0):
+		if index == 0:
+			return heappop(self.heap)[1]
+		(_, actId) = self.heap.pop(index)
+		heapify(self.heap)
+		return actId
@@ -1,27 +1,55 @@
 #! /user/bin/python
+import numpy
 from classes.Instance import Instance
 from classes.Activity import Activity
 from classes.Report import Report
 from classes.Solution import Solution
 from classes.Testdata import Testdata
+from classes.PairwiseFloat import PairwiseFloat
+from collections import namedtuple
+from lowerBounds import criticalPathBound, resourceBound, lowerBound, getBestKnown
+
+ChtourouMetrics = namedtuple('ChtourouMetrics', ['slack', 'cappedSlack', 'alpha', 'metrics'])
 
 def report(data):
 	from solver import solve
 	report = Report()
 
+	reportChainerStatistics(report, data['pos'])
+
+	# network metrics are computed on the transitive reductions, leaving the instance and POS untouched
+	data = dict(data, instance = data['instance'].getTransitiveReduction(), pos = data['pos'].getTransitiveReduction())
+
 	reportInstanceProperties(report, data['instance'])
 	reportInstanceStructure(report, data['instance'], 'instance')
 	reportInstanceStructure(report, data['pos'], 'pos')
 
 	solveData = {'options':{'solver':'noResources'},'instance':data['pos']}
-	pos_est_schedule = solve(solveData)
-	reportScheduleQuality(report, data['instance'], data['solution'], 'schedule')
+	# the POS has no resource capacities, so its schedule is a solution of the instance, to measure its resource usage
+	pos_est_schedule = Solution(data['instance'])
+	pos_est_schedule.startTimes = solve(solveData).startTimes
+	# the pairwise float of the solution is computed once, for the schedule quality and all delay scenarios
+	data['pairwiseFloat'] = PairwiseFloat(data['instance'], data['solution'])
+	reportScheduleQuality(report, data['instance'], data['solution'], 'schedule', data['pairwiseFloat'])
+	reportLowerBounds(report, data['instance'], data['solution'], data['options'].get('bounds', ''))
 	reportScheduleQuality(report, data['pos'], pos_est_schedule, 'pos_est_schedule')
 
 	reportTestData(report, data)
+	reportSolverStatistics(report, data['solution'])
 
 	return report
 
+# SOLVER STATISTICS
+def reportSolverStatistics(report, solution):
+	for (key, value) in solution.statistics.iteritems():
+		if not isinstance(value, list):
+			report.addFinding('solver_' + key, value)
+
+# CHAINER STATISTICS
+def reportChainerStatistics(report, pos):
+	for (key, value) in pos.statistics.iteritems():
+		report.addFinding('chainer_' + key, value)
+
 # INSTANCE PROPERTIES
 def reportInstanceProperties(report, instance):
 	report.addFinding("horizon", instance.getHorizon())
@@ -31,178 +59,179 @@ def reportInstanceStructure(report, instance, prefix):
 	report.addFinding(prefix + "_flex", instance.calculateFlex())
 	report.addFinding(prefix + "_numConnections", instance.countConstraints())
 
+# LOWER BOUNDS
+def reportLowerBounds(report, instance, schedule, boundsFilename):
+	bound = lowerBound(instance)
+	makespan = schedule.getMakespan()
+	report.addFinding("lb_criticalPath", criticalPathBound(instance))
+	report.addFinding("lb_resource", resourceBound(instance))
+	report.addFinding("lowerBound", bound)
+	report.addFinding("schedule_lbGap", float(makespan - bound) / bound if bound > 0 else 0.0)
+	bestKnown = getBestKnown(instance, boundsFilename)
+	if bestKnown != None:
+		report.addFinding("bestKnown", bestKnown)
+		report.addFinding("schedule_bestKnownGap", float(makespan - bestKnown) / bestKnown if bestKnown > 0 else 0.0)
+
 # SCHEDULE PROPERTIES
-def reportScheduleQuality(report, instance, schedule, prefix):
+def reportScheduleQuality(report, instance, schedule, prefix, pairwiseFloat = None):
+	if pairwiseFloat == None:
+		pairwiseFloat = PairwiseFloat(instance, schedule)
 	report.addFinding(prefix + "_makespan", schedule.getMakespan())
-	report.addFinding(prefix + "_avgRscUsg", calculateAverageResourceUsage(instance, schedule))
+	report.addFinding(prefix + "_avgRscUsg", calculateAverageResourceUsage(schedule))
+	report.addFinding(prefix + "_peakRscUsg", calculatePeakResourceUsage(schedule))
 	reportChtourouMetrics(report, instance, schedule, prefix)
 	reportRiskFactor(report, instance, schedule, prefix)
 	reportTotalRoom(report, instance, schedule, prefix)
-	report.addFinding(prefix + '_connectedTotalFloat', getConnectedTotalFloat(instance, schedule))
+	report.addFinding(prefix + '_connectedTotalFloat', pairwiseFloat.connectedTotalFloat())
 	report.addFinding(prefix + '_predecessorConsumption', calculatePredecessorConsumption(instance))
 
 def reportChtourouMetrics(report, instance, schedule, prefix):
-	# calculate metrics
-	deadline = schedule.getMakespan()
-	slack = map(lambda actId: calculateSlack(instance, schedule, actId, deadline), range(len(instance.activities)))
-	alpha = [1 if s > 0 else 0 for s in slack]
-	#frac = float(sum(slack)) / instance.getHorizon()
-	cappedSlack = map(min, slack, [act.time for act in instance.activities])
-
-	rawMetrics = map(chtourouMetricsSingleAct, instance.activities, slack, alpha, cappedSlack)
-	metrics = reduce(lambda x,y: map(float.__add__, x, y), rawMetrics)
+	metrics = calculateChtourouMetrics(instance, schedule.startTimes)
 	
 	# report metrics
-	for i, metric in enumerate(metrics):
-		report.addFinding("{0}_RB{1}".format(prefix, i + 1), metric)
+	for i, metric in enumerate(metrics.metrics):
+		report.addFinding("{0}_RB{1}".format(prefix, i + 1), float(metric))
 
 def reportRiskFactor(report, instance, schedule, prefix):
-	riskFactors = [-1] * len(instance.activities)
-	calculateRiskFactor(instance, schedule, 0, riskFactors)
-	report.addFinding(prefix + "_riskFactor", sum(riskFactors))
+	report.addFinding(prefix + "_riskFactor", sum(calculateRiskFactors(instance, schedule)))
 
 def reportTotalRoom(report, instance, schedule, prefix):
 	report.addFinding(prefix + "_totalRoom", sum(map(lambda actId: sum(map(lambda succId: schedule.startTimes[succId] - schedule.startTimes[actId] - instance.activities[actId].time, instance.activities[actId].successors), 0), range(len(instance.activities))), 0))
 
 
-def calculateRiskFactor(instance, schedule, actId, riskFactors):
-	if riskFactors[actId] >= 0:
-		return riskFactors[actId]
-	riskFactor = 1
-	act = instance.activities[actId]
-	for succ in act.successors:
-		succRiskFactor = calculateRiskFactor(instance, schedule, succ, riskFactors)
-		riskFactor += succRiskFactor * (float(act.time + 1) / float(schedule.startTimes[succ] - schedule.startTimes[actId] + 1))
-	riskFactors[actId] = riskFactor
-	return riskFactor
-
-def chtourouMetricsSingleAct(act, slack, alpha, cappedSlack, totalResources = 1):
-	numSucc = len(act.successors)
-	sumRes = sum(act.resources)
-	metrics = []
-
-	metrics.append(slack) #RB1
-	metrics.append(slack * numSucc) #RB2
-	metrics.append(slack * sumRes) #RB3
-	metrics.append(slack * numSucc * sumRes) #RB4
-
-	metrics.append(alpha) #RB5
-	metrics.append(alpha * numSucc) #RB6
-	metrics.append(alpha * sumRes) #RB7
-	metrics.append(alpha * numSucc * sumRes) #RB8
-
-	metrics.append(cappedSlack) #RB9
-	metrics.append(cappedSlack * numSucc) #RB10
-	metrics.append(cappedSlack * sumRes) #RB11
-	metrics.append(cappedSlack * numSucc * sumRes) #RB12
-
-	normRes = float(sumRes) / float(totalResources)
-	metrics.append(slack * normRes)
-	metrics.append(alpha * normRes)
-	metrics.append(cappedSlack * normRes)
-
-	return map(float, metrics)
-
-
-def calculateSlack(instance, schedule, actId, deadline):
-	act = instance.activities[actId]
-	earliestFinishingTime = act.time + schedule.startTimes[actId]
-	latestFinishingtime = deadline
-	for succ in act.successors:
-		if schedule.startTimes[succ] < latestFinishingtime:
-			latestFinishingtime = schedule.startTimes[succ]
-	return latestFinishingtime - earliestFinishingTime
-
-def calculateAverageResourceUsage(instance, solution):
-	if len(instance.resources) == 0:
+def calculateRiskFactors(instance, schedule):
+	"""Returns the risk factor of every activity that can be reached from the first activity, and -1 for the others.
+	The risk factor of an activity is 1 plus the risk factors of its successors, each weighted by (duration + 1) / (distance in start time + 1).
+	The factors are computed over the reverse topological order, so deep networks do not hit the recursion limit."""
+	activities = instance.activities
+	startTimes = schedule.startTimes
+	order = instance.getTopologicalOrdering()
+	riskFactors = [-1] * len(activities)
+	if len(activities) == 0:
+		return riskFactors
+
+	reachable = [False] * len(activities)
+	reachable[0] = True
+	for actId in order:
+		if reachable[actId]:
+			for succ in activities[actId].successors:
+				reachable[succ] = True
+
+	for actId in reversed(order):
+		if not reachable[actId]:
+			continue
+		act = activities[actId]
+		riskFactor = 1
+		for succ in act.successors:
+			riskFactor += riskFactors[succ] * (float(act.time + 1) / float(startTimes[succ] - startTimes[actId] + 1))
+		riskFactors[actId] = riskFactor
+	return riskFactors
+
+def calculateChtourouMetrics(instance, startTimes, durations = None, totalResources = 1):
+	"""Calculates the slack based robustness metrics RB1 to RB15 of Chtourou and Haouari.
+	The start times (and optionally the durations) can be a vector, or a (scenarios x activities) matrix to calculate
+	the metrics of many schedules at once. The slack of an activity is the time between its end and the earliest start of
+	its successors, or the end of the schedule. Returns a ChtourouMetrics tuple with the slack, capped slack and alpha
+	per activity, and the metrics RB1 to RB15 in the last dimension of the metrics array."""
+	activities = instance.activities
+	startTimes = numpy.asarray(startTimes, dtype = float)
+	if durations is None:
+		durations = [act.time for act in activities]
+	durations = numpy.asarray(durations, dtype = float)
+	numSucc = numpy.array([len(act.successors) for act in activities], dtype = float)
+	sumRes = numpy.array([sum(act.resources) for act in activities], dtype = float)
+
+	endTimes = startTimes + durations
+	deadline = numpy.where(startTimes > -1, endTimes, -numpy.inf).max(axis = -1)
+
+	# the earliest start of the successors of each activity, taken over all successors at once
+	latestFinish = numpy.repeat(deadline[..., None], len(activities), axis = -1)
+	withSucc = [actId for (actId, act) in enumerate(activities) if len(act.successors) > 0]
+	if len(withSucc) > 0:
+		succIds = [succ for actId in withSucc for succ in sorted(activities[actId].successors)]
+		offsets = numpy.cumsum([0] + [len(activities[actId].successors) for actId in withSucc[:-1]])
+		earliestSuccStart = numpy.minimum.reduceat(startTimes[..., succIds], offsets, axis = -1)
+		latestFinish[..., withSucc] = numpy.minimum(latestFinish[..., withSucc], earliestSuccStart)
+
+	slack = latestFinish - endTimes
+	alpha = (slack > 0).astype(float)
+	cappedSlack = numpy.minimum(slack, durations)
+
+	# RB1-4 weigh the slack, RB5-8 alpha and RB9-12 the capped slack by 1, the number of successors,
+	# the summed resources and both; RB13-15 weigh them by the normalised resources
+	weights = [numpy.ones(len(activities)), numSucc, sumRes, numSucc * sumRes]
+	normRes = sumRes / float(totalResources)
+	perActivity = [value * weight for value in [slack, alpha, cappedSlack] for weight in weights] + [value * normRes for value in [slack, alpha, cappedSlack]]
+	metrics = numpy.stack([values.sum(axis = -1) for values in perActivity], axis = -1)
+	return ChtourouMetrics(slack, cappedSlack, alpha, metrics)
+
+def calculateAverageResourceUsage(solution):
+	"""Returns the usage of each resource over the makespan relative to its capacity, averaged over the resources of the instance of the solution"""
+	resources = solution.instance.resources
+	if len(resources) == 0:
 		return 0
 	timepoints = int(solution.getMakespan())
-	resourceUsage = [0] * len(instance.resources)
-	for t in range(timepoints):
-		resourceUsage = map(int.__add__, resourceUsage, solution.getResourceUsage(t))
-	avgResourceUsage = map(lambda tot, cap: float(tot) / float(cap * timepoints), resourceUsage, instance.resources)
-	return sum(avgResourceUsage) / len(instance.resources)
+	resourceUsage = solution.getTotalUsage(timepoints)
+	avgResourceUsage = map(lambda tot, cap: float(tot) / float(cap * timepoints), resourceUsage, resources)
+	return sum(avgResourceUsage) / len(resources)
+
+def calculatePeakResourceUsage(solution):
+	"""Returns the peak usage of each resource relative to its capacity, averaged over the resources of the instance of the solution"""
+	resources = solution.instance.resources
+	if len(resources) == 0:
+		return 0
+	peakResourceUsage = map(lambda peak, cap: float(peak) / float(cap), solution.getPeakUsage(), resources)
+	return sum(peakResourceUsage) / len(resources)
 
 def calculatePredecessorConsumption(instance):
-	predecessorUsage = map(lambda act: float(sum(map(lambda predId: sum(instance.activities[predId].resources), act.predecessors))), instance.activities)
-	resourceUsage = map(lambda act: float(sum(act.resources)), instance.activities)
-	predecessorResourceConsumption = map(lambda res, pred: res / pred if pred > 0 else 1.0, resourceUsage, predecessorUsage)
+	"""Returns the mean over all activities of the resource consumption of an activity divided by that of its predecessors (1 without predecessors)"""
+	resourceUsage = [sum(act.resources) for act in instance.activities]
+	predecessorResourceConsumption = []
+	for (actId, act) in enumerate(instance.activities):
+		predecessorUsage = sum([resourceUsage[pred] for pred in act.predecessors])
+		predecessorResourceConsumption.append(float(resourceUsage[actId]) / float(predecessorUsage) if predecessorUsage > 0 else 1.0)
 	return sum(predecessorResourceConsumption) / float(len(predecessorResourceConsumption))
 
 # TEST DATA
 def reportTestData(report, data):
-	totals = {}
-	for delayFile, delayedStartTimes in data['testdata'].results.iteritems():
-		delayedStartTimesInfo = getTestInstanceInfo(report, data, delayedStartTimes, getDelays(data['instance'], delayFile))
-		totals = {x: totals.get(x, 0) + delayedStartTimesInfo[x] for x in delayedStartTimesInfo}
-	for fact, value in totals.iteritems():
-		report.addFinding(fact, float(value) / len(data['testdata'].results))
-
-def getDelays(instance, delayFile):
-	f = open(delayFile, 'r')
-	delays = map(float, list(f))
-	f.close()
+	"""Reports the averages over all delay scenarios, computed for all scenarios at once"""
+	results = data['testdata'].results
+	if len(results) == 0:
+		return
+	instance = data['instance']
+	solution = data['solution']
+	pairwiseFloat = data.get('pairwiseFloat')
+	if pairwiseFloat == None:
+		pairwiseFloat = PairwiseFloat(instance, solution)
+
+	delayFiles = results.keys()
+	durations = numpy.array([act.time for act in instance.activities], dtype = float)
+	startTimes = numpy.array(solution.startTimes, dtype = float)
+	delayedStartTimes = numpy.array([results[delayFile] for delayFile in delayFiles], dtype = float)
+	delays = numpy.array([getDelays(instance, delayFile, data.get('delays')) for delayFile in delayFiles])
+	limits = delayedStartTimes - startTimes + delays
+
+	report.addFinding('makespan', float((delayedStartTimes + durations).max(axis = 1).mean()))
+	report.addFinding('numDelays', float((delayedStartTimes > startTimes).sum(axis = 1).mean()))
+	report.addFinding('totalDelay', float((delayedStartTimes - startTimes).sum(axis = 1).mean()))
+	report.addFinding('effectiveTotalFloat', float(pairwiseFloat.totalFloat(limits).mean()))
+
+	# the robustness metrics of the delayed schedules, with the delayed durations
+	delayedDurations = durations + delays
+	delayedMetrics = calculateChtourouMetrics(instance, delayedStartTimes, delayedDurations).metrics.mean(axis = 0)
+	for i, metric in enumerate(delayedMetrics):
+		report.addFinding("delayed_RB{0}".format(i + 1), float(metric))
+
+	# check that the delayed schedules, with the delayed durations, respect the resource capacities
+	feasible = [solution.isResourceFeasible(starts, scenarioDurations) for (starts, scenarioDurations) in zip(delayedStartTimes.tolist(), delayedDurations.tolist())]
+	report.addFinding('resourceFeasible', float(sum(feasible)) / len(feasible))
+
+def getDelays(instance, delayFile, delays = None):
+	if delays != None and delayFile in delays:
+		delays = delays[delayFile]
+	else:
+		f = open(delayFile, 'r')
+		delays = map(float, list(f))
+		f.close()
 
 	return map(lambda delay, act: (delay - 1.0) * float(act.time), delays[:len(instance.activities)], instance.activities)
-
-
-def getTestInstanceInfo(report, data, delayedStartTimes, delays):
-	from solver import solve
-	delayedStartTimesInfo = {}
-
-	delayedSolution = Solution(data['instance'])
-	delayedSolution.startTimes = delayedStartTimes
-
-	# gather data
-	delayedStartTimesInfo['makespan'] = delayedSolution.getMakespan()
-	delayedStartTimesInfo['numDelays'] = sum(map(float.__gt__, map(float, delayedSolution.startTimes), map(float,data['solution'].startTimes)))
-	delayedStartTimesInfo['totalDelay'] = sum(map(float.__sub__, map(float, delayedSolution.startTimes), map(float, data['solution'].startTimes)))
-	delayedStartTimesInfo['effectiveTotalFloat'] = getLimitedTotalFloat(data['instance'], data['solution'], delayedStartTimes, delays)
-	
-	return delayedStartTimesInfo
-
-def getLimitedTotalFloat(instance, solution, delayedStartTimes, delays):
-	limits = map(lambda st, dst, dl: dst - st + dl, map(float, solution.startTimes), delayedStartTimes, delays)
-	pairwiseFloat = getPairwiseFloat(instance, solution)
-	return getTotalFloat(pairwiseFloat, limits)
-
-def getConnectedTotalFloat(instance, solution):
-	n = len(instance.activities)
-	pairwiseFloat = getPairwiseFloat(instance, solution)
-	totalConnectedFloat = 0
-	horizon = instance.getHorizon()
-	for i in range(n):
-		for j in range(i + 1, n):
-			if pairwiseFloat[i][j] < horizon:
-				totalConnectedFloat = totalConnectedFloat + pairwiseFloat[i][j]
-	return totalConnectedFloat
-
-def getPairwiseFloat(instance, solution):
-	n = len(instance.activities)
-	limit = instance.getHorizon();
-	pairwiseFloat = [([limit] * l) + [0] + ([limit] * (n - l - 1)) for l in range(n)]
-
-	def getFloat(actId, successorId):
-		return solution.startTimes[successorId] - solution.startTimes[actId] - instance.activities[actId].time
-
-	def setSuccessorPairwiseFloat(actId, successorId, succPairwiseFloat):
-		if succPairwiseFloat < pairwiseFloat[actId][successorId]:
-			pairwiseFloat[actId][successorId] = succPairwiseFloat
-			successor = instance.activities[successorId]
-			for succ in successor.successors:
-				setSuccessorPairwiseFloat(actId, succ, succPairwiseFloat + getFloat(successorId, succ))
-	for actId, act in enumerate(instance.activities):
-		for successor in act.successors:
-			setSuccessorPairwiseFloat(actId, successor, getFloat(actId, successor))
-	return pairwiseFloat
-
-def getTotalFloat(pairwiseFloat, limits):
-	n = len(limits)
-	totalFloat = 0
-	for i in range(n):
-		for j in range(i + 1, n):
-			totalFloat = totalFloat + min([limits[i], pairwiseFloat[i][j]])
-	return totalFloat
-
-
-
@@ -0,0 +1,104 @@
+import random, time
+from multiprocessing import Pool, current_process, cpu_count
+from classes.Solution import Solution
+from solver import solveSerial
+
+# The passes are divided over a fixed number of seeded streams, so a budget of schedules gives the same result
+# on every machine, however many cores it has.
+numSeedStreams = 8
+
+def parseBudget(budget):
+	"""Parses a schedule budget: either a number of schedules ('1000') or a number of seconds ('60s').
+	Returns a (numSchedules, timeLimit) tuple, one of which is None. A budget of zero is a single schedule."""
+	if budget.endswith('s'):
+		timeLimit = float(budget[:-1])
+		return (None, timeLimit) if timeLimit > 0 else (1, None)
+	return (max(int(budget), 1), None)
+
+def regretSelector(priorities, rng, epsilon = 1.0, alpha = 1.0):
+	"""Returns a selector that picks an eligible activity at random, biased by its regret:
+	the difference between its priority value and the worst priority value in the eligible list."""
+	def select(todo):
+		values = [priorities[actId] for actId in todo]
+		worst = max(values)
+		weights = [(worst - value + epsilon) ** alpha for value in values]
+		remaining = rng.random() * sum(weights)
+		for (index, weight) in enumerate(weights):
+			remaining -= weight
+			if remaining < 0:
+				return index
+		return len(weights) - 1
+	return select
+
+def solveSampling(solution, priorities, budget = '1000', usePool = False):
+	"""Runs biased random serial SGS passes until the budget is spent and keeps the shortest schedule.
+	The passes are divided over numSeedStreams seeded streams; if usePool is set, the streams are distributed over all cores.
+	With a time limit, every stream gets an equal share of the time of the cores.
+	Statistics on the run are stored in solution.statistics."""
+	(numSchedules, timeLimit) = parseBudget(budget)
+	numWorkers = min(cpu_count(), numSeedStreams) if usePool and not current_process().daemon else 1
+
+	jobs = []
+	for seed in range(numSeedStreams):
+		streamSchedules = None
+		streamTimeLimit = None
+		if numSchedules != None:
+			streamSchedules = numSchedules / numSeedStreams + (1 if seed < numSchedules % numSeedStreams else 0)
+		else:
+			streamTimeLimit = timeLimit * numWorkers / numSeedStreams
+		jobs.append((solution.instance, priorities, streamSchedules, streamTimeLimit, seed))
+
+	startTime = time.time()
+	if numWorkers > 1:
+		workers = Pool(numWorkers)
+		results = workers.map(samplePasses, jobs)
+		workers.close()
+		workers.join()
+	else:
+		results = map(samplePasses, jobs)
+	seconds = time.time() - startTime
+
+	# merge the results of all workers
+	bestMakespan = -1
+	bestStartTimes = None
+	improvements = []
+	for (startTimes, makespan, passes, curve) in results:
+		if startTimes != None and (bestMakespan == -1 or makespan < bestMakespan):
+			bestMakespan = makespan
+			bestStartTimes = startTimes
+		improvements += curve
+
+	curve = []
+	for (elapsed, makespan) in sorted(improvements):
+		if len(curve) == 0 or makespan < curve[-1][1]:
+			curve.append((elapsed, makespan))
+
+	solution.setStartTimes(bestStartTimes)
+	passes = sum([result[2] for result in results])
+	solution.statistics['passes'] = passes
+	solution.statistics['seconds'] = seconds
+	solution.statistics['passesPerSecond'] = passes / seconds if seconds > 0 else 0.0
+	solution.statistics['bestMakespanCurve'] = curve
+
+def samplePasses(job):
+	"""Runs the sampling passes of one seed stream. The instance is shared by all passes, only the solution is renewed.
+	With a time limit, at least one pass is run."""
+	(instance, priorities, numSchedules, timeLimit, seed) = job
+	selector = regretSelector(priorities, random.Random(seed))
+
+	startTime = time.time()
+	bestMakespan = -1
+	bestStartTimes = None
+	curve = []
+	passes = 0
+	while (numSchedules == None or passes < numSchedules) and (timeLimit == None or passes == 0 or time.time() - startTime < timeLimit):
+		solution = Solution(instance)
+		solveSerial(solution, selector = selector)
+		passes += 1
+		makespan = solution.getMakespan()
+		if bestMakespan == -1 or makespan < bestMakespan:
+			bestMakespan = makespan
+			bestStartTimes = solution.startTimes
+			curve.append((time.time() - startTime, makespan))
+
+	return (bestStartTimes, bestMakespan, passes, curve)
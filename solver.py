@@ -3,58 +3,108 @@ from classes.Activity import Activity
 from classes.Report import Report
 from classes.Solution import Solution
 from classes.Testdata import Testdata
+from heapq import heappush, heappop
+from itertools import imap
+from multiprocessing import Pool, current_process
+from priorityRules import chooseRule, PriorityList, priorityLFT
+from lowerBounds import targetMakespan
+
+candidateSolvers = ['serial', 'serialFBI', 'parallel', 'parallelFBI']
 
 def solve(data):
 	instance = data['instance']
 	options = data['options']
 	solution = Solution(instance)
+	eligibleList = list
+	rule = chooseRule(options['solver'])
+	if rule:
+		priorities = rule(instance)
+		eligibleList = lambda actIds: PriorityList(priorities, actIds)
 	if options['solver'] == 'noResources':
-		solveSerial(solution, False)
+		durations = [act.time for act in instance.activities]
+		solution.startTimes = instance.getLongestPath().earliestStarts(durations).tolist()
 	if options['solver'] == 'shortest':
-		findBestSolver(solution)
+		target = None
+		if options.get('earlyexit', False):
+			target = targetMakespan(instance, options.get('bounds', ''))
+		findBestSolver(solution, not options.get('st', False), target)
+	if options['solver'].startswith('sampling'):
+		from sampling import solveSampling
+		priorities = (rule or priorityLFT)(instance)
+		solveSampling(solution, priorities, options.get('budget', '1000'), not options.get('st', False))
+	if options['solver'] == 'genetic':
+		from genetic import solveGenetic
+		solveGenetic(solution, priorityLFT(instance), options.get('budget', '1000'))
 	if options['solver'].startswith('serial'):
-		solveSerial(solution)
+		solveSerial(solution, eligibleList = eligibleList)
 	if options['solver'].startswith('parallel'):
-		solveParallel(solution)
-	if options['solver'].endswith('FBI'):
+		solveParallel(solution, eligibleList = eligibleList)
+	if options['solver'].endswith('IterFBI'):
+		improveFBI(solution, True)
+	elif options['solver'].endswith('FBI'):
 		improveFBI(solution)
 	return solution
 
-def findBestSolver(solution):
-	solveSerial(solution)
+def findBestSolver(solution, usePool = False, target = None):
+	"""Runs every candidate solver and keeps the schedule with the shortest makespan.
+	If usePool is set, the candidates are solved concurrently in a process pool.
+	If a target makespan is given, the remaining candidates are skipped as soon as a schedule meets it."""
+	jobs = [(solution.instance, solver) for solver in candidateSolvers]
+	workers = None
+	if usePool and not current_process().daemon:
+		workers = Pool(len(jobs))
+		results = workers.imap(solveCandidate, jobs)
+	else:
+		results = imap(solveCandidate, jobs)
+
+	makespan = -1
+	candidates = 0
+	for startTimes in results:
+		candidates += 1
+		solution.setStartTimes(startTimes)
+		if makespan == -1 or solution.getMakespan() < makespan:
+			makespan = solution.getMakespan()
+			bestStartTimes = startTimes
+		if target != None and makespan <= target:
+			break
+
+	if workers:
+		workers.terminate()
+		workers.join()
+	solution.setStartTimes(bestStartTimes)
+	solution.statistics['candidates'] = candidates
+
+def solveCandidate(job):
+	(instance, solver) = job
+	return solve({'options': {'solver': solver}, 'instance': instance}).startTimes
+
+def improveFBI(solution, iterate = False, backward = None):
+	"""Improves the solution by forward-backward improvement.
+	The backward pass is solved on a reversed view of the instance, so the instance itself is never modified.
+	If iterate is set, passes are repeated until the makespan no longer improves.
+	The start times and resource profiles of the solution, and of backward (a solution of the reversed view) when it is given,
+	are cleared in place and reused by every pass."""
+	activities = solution.instance.activities
+	if backward == None:
+		backward = Solution(solution.instance.getReversedView())
 	makespan = solution.getMakespan()
-	startTimes = solution.startTimes
-
-	improveFBI(solution)
-	if solution.getMakespan() < makespan:
+	while True:
+		orig_startTimes = solution.startTimes[:] if iterate else solution.startTimes
+		backward.clear()
+		selector = lambda todo: findLatestAct(todo, activities, orig_startTimes, True)
+		solveSerial(backward, selector = selector)
+
+		reversed_startTimes = backward.startTimes
+		solution.clear()
+		selector = lambda todo: findLatestAct(todo, activities, reversed_startTimes, False)
+		solveSerial(solution, selector = selector)
+
+		if not iterate:
+			return
+		if solution.getMakespan() >= makespan:
+			solution.setStartTimes(orig_startTimes)
+			return
 		makespan = solution.getMakespan()
-		startTimes = solution.startTimes
-	
-	solution.reset()
-	solveParallel(solution)
-	if solution.getMakespan() < makespan:
-		makespan = solution.getMakespan()
-		startTimes = solution.startTimes
-
-	improveFBI(solution)
-	if solution.getMakespan() < makespan:
-		makespan = solution.getMakespan()
-		startTimes = solution.startTimes
-
-	solution.startTimes = startTimes
-
-def improveFBI(solution):
-	orig_startTimes = solution.startTimes
-	solution.instance.reverse()
-	solution.reset()
-	selector = lambda todo: findLatestAct(todo, solution.instance.activities, orig_startTimes, True)
-	solveSerial(solution, selector = selector)
-
-	reversed_startTimes = solution.startTimes
-	solution.instance.reverse()
-	solution.reset()
-	selector = lambda todo: findLatestAct(todo, solution.instance.activities, reversed_startTimes, False)
-	solveSerial(solution, selector = selector)
 
 def findLatestAct(actIds, acts, startTimes, calcMax = True):
 	latestTime = -1
@@ -68,45 +118,48 @@ def findLatestAct(actIds, acts, startTimes, calcMax = True):
 			latestId = listId
 	return latestId
 
-def solveParallel(solution, selector = lambda todo: 0):
+def solveParallel(solution, selector = lambda todo: 0, eligibleList = list):
+	"""Parallel schedule generation scheme, advancing from one decision point to the next.
+	A decision point is the next completion time of an active activity. Activities finishing
+	at the current decision point itself (zero duration) release their successors one time unit
+	later, just like the original time-stepped scheme did."""
 	activities = solution.instance.activities
-	resources = solution.instance.resources
-	scheduledActs = set()
+	numPreds = [len(act.predecessors) for act in activities]
+	eligible = set(x for (x, n) in enumerate(numPreds) if n == 0)
+	active = []
+	numScheduled = 0
 	time = 0
-	while len(scheduledActs) < len(activities):
-		eligible = parDetermineEligible(time, solution, scheduledActs)
-		while len(eligible) > 0:
-			candidate = eligible.pop(selector(eligible))
+	while numScheduled < len(activities):
+		# release successors of all activities finished at this decision point
+		while active and active[0][0] <= time:
+			(_, finished) = heappop(active)
+			for succ in activities[finished].successors:
+				numPreds[succ] -= 1
+				if numPreds[succ] == 0:
+					eligible.add(succ)
+
+		# try to start eligible activities, in order of their ids
+		candidates = eligibleList(sorted(eligible))
+		while len(candidates) > 0:
+			candidate = candidates.pop(selector(candidates))
 			nextAct = activities[candidate]
 			if isFeasible(solution, nextAct, time):
-				solution.startTimes[candidate] = time
-				scheduledActs.add(candidate)
-		time += 1
-
-def parDetermineEligible(time, solution, scheduledActs):
-	activities = solution.instance.activities
-	startTimes = solution.startTimes
-	eligibleActs = []
-	for x, act in enumerate(activities):
-		if x in scheduledActs:
-			continue
-		eligible = True
-		for pred in act.predecessors:
-			if not pred in scheduledActs:
-				eligible = False
-				break
-			if startTimes[pred] + activities[pred].time > time:
-				eligible = False
-				break
-		if eligible:
-			eligibleActs.append(x)
-	return eligibleActs
-
+				solution.setStartTime(candidate, time)
+				eligible.remove(candidate)
+				heappush(active, (time + nextAct.time, candidate))
+				numScheduled += 1
+
+		# advance to the next decision point
+		if active:
+			if active[0][0] > time:
+				time = active[0][0]
+			else:
+				time += 1
 
-def solveSerial(solution, checkResources = True, selector = lambda todo: 0):
+def solveSerial(solution, checkResources = True, selector = lambda todo: 0, eligibleList = list):
 	activities = solution.instance.activities
 	resources = solution.instance.resources
-	todo = [x for (x, act) in enumerate(activities) if len(act.predecessors) == 0]
+	todo = eligibleList([x for (x, act) in enumerate(activities) if len(act.predecessors) == 0])
 	scheduledActs = set()
 	while len(todo) > 0:
 		# Next activity to schedule
@@ -116,10 +169,9 @@ def solveSerial(solution, checkResources = True, selector = lambda todo: 0):
 		# Find correct time
 		time = latestPredecessorEndtime(solution, nextAct)
 		if checkResources:
-			while not isFeasible(solution, nextAct, time):
-				time += 1
+			time = solution.profile.earliestFeasibleStart(nextAct, time)
 		
-		solution.startTimes[nextIndex] = time
+		solution.setStartTime(nextIndex, time)
 		scheduledActs.add(nextIndex)
 		
 		# Add successors to todo list (if applicable)
@@ -135,12 +187,7 @@ def latestPredecessorEndtime(solution, nextAct):
 	return time
 
 def isFeasible(solution, activity, time):
-	for t in range(time, time + activity.time):
-		resourceUsage = solution.getResourceUsage(t)
-		for (i, cap) in enumerate(solution.instance.resources):
-			if activity.resources[i] + resourceUsage[i] > cap:
-				return False
-	return True
+	return solution.profile.isFeasible(activity, time)
 
 def findEligableSuccessors(nextAct, activities, scheduledActs):
 	eligable = []
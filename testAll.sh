@@ -3,16 +3,17 @@
 function simulate {
 	n=$1
 	solver=$2
-	chainer=$3
+	chainers=$3
 	testset=$4
 	
-	# Run simulation, generate reports
-	./main.py -s ${solver} -c ${chainer} -t ${testset} ../datasets/j${n}/j${n}*.sm;
+	# Run simulation of all chainers in one batch, generate reports
+	./main.py -s ${solver} -c $(echo ${chainers} | tr ' ' ',') -t ${testset} ../datasets/j${n}/j${n}*.sm;
 	# summarize reports
-	infiles="output/report/j$n*.sm.sol_${solver}.chain_${chainer}.test_${testset}.report"
-	outfile="output/summary/j${n}_${solver}_${chainer}_${testset}"
-	./aggregator.py -o $outfile $infiles
-
+	for chainer in $chainers; do
+		infiles="output/report/j$n*.sm.sol_${solver}.chain_${chainer}.test_${testset}.report"
+		outfile="output/summary/j${n}_${solver}_${chainer}_${testset}"
+		./aggregator.py -o $outfile $infiles
+	done
 }
 
 # instance sets
@@ -37,20 +38,15 @@ for n in $sizes; do
 	echo $n
 	for solver in $solvers; do
 		echo $solver
-		for chainer in "maxCCminID"; do
-			echo $chainer
-			for testset in "large"; do
-				echo $testset
-				simulate $n $solver $chainer $testset
-			done
+		for testset in "large"; do
+			echo $testset
+			simulate $n $solver "maxCCminID" $testset
 		done
 	done
 done
 
-#for chainer in $gurobichainers ; do # only available for instance size 30
-#	echo $chainer
-#	for testset in "exp2" "gauss_1_02" "unif_80_5" "fixed_50_30"; do
-#		simulate "30" "serial" ${chainer} ${testset}
-#	done
+#for testset in "exp2" "gauss_1_02" "unif_80_5" "fixed_50_30"; do # gurobi chainers only available for instance size 30
+#	echo $testset
+#	simulate "30" "serial" "${gurobichainers}" ${testset}
 #done
 
@@ -1,20 +1,26 @@
 #! /user/bin/python
 
 import os, os.path
-from solver import solve
-from classes.Testdata import Testdata
+from classes.Testdata import Testdata, readDelays
+from classes.Solution import Solution
 
 def test(data):
-	folder = data['options']['testset']
-	if not os.path.isdir(folder):
-		folder = '../datasets/delays/{0}/'.format(data['options']['testset'])
+	delays = data.get('delays')
+	if delays == None:
+		delays = loadDelays(data['options'])
 	testdata = Testdata(data['pos'])
 
-	for delayset in os.listdir(folder):
-		testdata.addTest(folder + '/' + delayset)
+	testdata.addTests(delays.keys(), delays = delays)
 
 	return testdata
 
+def loadDelays(options):
+	"""Reads all delay files of the test set into a dictionary, mapping file names to lists of delays"""
+	folder = options['testset']
+	if not os.path.isdir(folder):
+		folder = '../datasets/delays/{0}/'.format(options['testset'])
+	return {folder + '/' + delayset: readDelays(folder + '/' + delayset) for delayset in os.listdir(folder)}
+
 def testFromFile(data, inputfile):
 	f = open(inputfile, 'r')
 	delays = map(float, list(f))
@@ -24,8 +30,9 @@ def testFromFile(data, inputfile):
 	for (index, act) in enumerate(delayedProblem.activities):
 		act.time *= delays[index]
 	
-	toSolve = {'options':{'solver':"noResources"},'instance':delayedProblem}
-	delayedSolution = solve(toSolve)
+	delayedSolution = Solution(delayedProblem)
+	durations = [act.time for act in delayedProblem.activities]
+	delayedSolution.startTimes = data['pos'].getLongestPath().earliestStarts(durations).tolist()
 
 	(numDelays, totalDelay) = getTaskDelays(data['solution'], delayedSolution)
 	